@@ -0,0 +1,84 @@
+"""Per-request overhead of crawler access analytics.
+
+Measures the time spent on a single request by classifying the User-Agent
+header and updating in-process counters, and by the complete `after_request`
+hook of the sitemap blueprint, which also derives the file name from the
+request. Flushes are disabled, so only the work done on every request is
+measured.
+
+Usage:
+
+    python benchmarks/analytics.py [--requests 200000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+from flask import Flask, Response, g
+
+from ckanext.sitemap import analytics
+from ckanext.sitemap.analytics import CrawlerCounters, classify_user_agent
+
+
+USER_AGENTS = [
+    "Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)",
+    "Mozilla/5.0 (compatible; bingbot/2.0; +http://www.bing.com/bingbot.htm)",
+    "Mozilla/5.0 (compatible; YandexBot/3.0; +http://yandex.com/bots)",
+    "Mozilla/5.0 (compatible; AhrefsBot/7.0; +http://ahrefs.com/robot/)",
+    "Mozilla/5.0 (X11; Linux x86_64; rv:128.0) Gecko/20100101 Firefox/128.0",
+]
+FILES = ["sitemap.xml", "recent.xml", "datasets-1.xml", "datasets-2.xml", "groups-1.xml"]
+PATHS = ["/sitemap.xml", "/sitemap/recent.xml", "/sitemap/datasets-1.xml", "/sitemap/other-99.xml"]
+
+
+def measure_hook(requests: int) -> float:
+    """Measure the `after_request` hook of the sitemap blueprint.
+
+    Returns:
+        float: seconds spent per request.
+    """
+    from ckanext.sitemap.views.sitemap import _count_crawler_request, sitemap
+
+    app = Flask(__name__)
+    app.register_blueprint(sitemap)
+    analytics._crawler_counters = CrawlerCounters(flush_interval=10**9)
+
+    duration = 0.0
+    for i, path in enumerate(PATHS):
+        user_agent = USER_AGENTS[i % len(USER_AGENTS)]
+        response = Response(b"x" * 12345, 404 if "other" in path else 200)
+        with app.test_request_context(path, headers={"User-Agent": user_agent}):
+            started = time.perf_counter()
+            for _ in range(requests // len(PATHS)):
+                g.sitemap_started = 0.0
+                _count_crawler_request(response)
+            duration += time.perf_counter() - started
+    return duration / (requests // len(PATHS) * len(PATHS))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200000)
+    args = parser.parse_args()
+
+    counters = CrawlerCounters(flush_interval=10**9)
+    requests = [
+        (USER_AGENTS[i % len(USER_AGENTS)], FILES[i % len(FILES)], 200 if i % 3 else 304)
+        for i in range(args.requests)
+    ]
+
+    started = time.perf_counter()
+    for user_agent, name, status in requests:
+        counters.record(classify_user_agent(user_agent), name, status, 12345, 0.001)
+    duration = time.perf_counter() - started
+
+    print(f"requests:     {args.requests}")
+    print(f"per request:  {duration / args.requests * 1e6:.2f} us")
+    print(f"counters:     {len(counters._counters)}")
+    print(f"hook:         {measure_hook(args.requests) * 1e6:.2f} us")
+
+
+if __name__ == "__main__":
+    main()
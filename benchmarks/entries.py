@@ -0,0 +1,130 @@
+"""Memory benchmark of the records passed through the generation pipeline.
+
+Compares the peak memory of enumerating a sitemap section as full
+`package_search` dictionaries with enumerating it as `SitemapEntry` records
+built from batches of `fl`-restricted search results. Dataset dictionaries are
+synthetic but shaped like real ones (extras, resources, tags, organization).
+
+Usage:
+
+    python benchmarks/entries.py [--datasets 1000]
+"""
+
+from __future__ import annotations
+
+import argparse
+import tracemalloc
+import uuid
+
+from ckanext.sitemap.entries import SitemapEntry
+
+
+BATCH_SIZE = 1000
+
+
+def full_dataset(index: int) -> dict:
+    name = f"dataset-{index:08d}"
+    return {
+        "id": str(uuid.uuid4()),
+        "name": name,
+        "title": f"Dataset number {index}",
+        "type": "dataset",
+        "state": "active",
+        "private": False,
+        "notes": "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 8,
+        "metadata_created": "2024-01-01T10:00:00.000000",
+        "metadata_modified": "2024-06-01T10:00:00.000000",
+        "license_id": "cc-by",
+        "author": "Data team",
+        "maintainer_email": "data@example.com",
+        "num_resources": 5,
+        "num_tags": 5,
+        "organization": {
+            "id": str(uuid.uuid4()),
+            "name": "organization",
+            "title": "Organization",
+            "description": "Organization description " * 4,
+            "image_url": "",
+            "created": "2023-01-01T10:00:00.000000",
+            "is_organization": True,
+            "state": "active",
+        },
+        "extras": [
+            {"key": f"extra_{i}", "value": f"value {i} of {name}"}
+            for i in range(10)
+        ],
+        "tags": [
+            {"id": str(uuid.uuid4()), "name": f"tag-{i}", "display_name": f"tag-{i}",
+             "state": "active", "vocabulary_id": None}
+            for i in range(5)
+        ],
+        "resources": [
+            {
+                "id": str(uuid.uuid4()),
+                "package_id": name,
+                "name": f"Resource {i}",
+                "url": f"https://example.com/{name}/resource-{i}.csv",
+                "format": "CSV",
+                "description": "Resource description " * 4,
+                "created": "2024-01-01T10:00:00.000000",
+                "last_modified": None,
+                "position": i,
+                "state": "active",
+            }
+            for i in range(5)
+        ],
+    }
+
+
+def solr_document(index: int) -> dict:
+    return {
+        "name": f"dataset-{index:08d}",
+        "dataset_type": "dataset",
+        "metadata_modified": "2024-06-01T10:00:00Z",
+    }
+
+
+def full_pipeline(count: int) -> int:
+    results = [full_dataset(i) for i in range(count)]
+    return sum(1 for _ in results)
+
+
+def compact_pipeline(count: int) -> int:
+    def enumerate_entries():
+        for start in range(0, count, BATCH_SIZE):
+            batch = [
+                solr_document(i)
+                for i in range(start, min(start + BATCH_SIZE, count))
+            ]
+            for doc in batch:
+                yield SitemapEntry.from_dict(doc)
+
+    # Keep every record alive, as a renderer building a tree would do
+    entries = list(enumerate_entries())
+    return len(entries)
+
+
+def measure(func, count: int) -> int:
+    tracemalloc.start()
+    func(count)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--datasets", type=int, default=1000)
+    args = parser.parse_args()
+
+    full = measure(full_pipeline, args.datasets)
+    compact = measure(compact_pipeline, args.datasets)
+
+    print(f"datasets:           {args.datasets}")
+    print(f"full dictionaries:  {full / 1024 / 1024:.2f} MiB peak")
+    print(f"SitemapEntry:       {compact / 1024 / 1024:.2f} MiB peak")
+    print(f"reduction:          {full / compact:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
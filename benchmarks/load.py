@@ -0,0 +1,48 @@
+"""Crawler-traffic load test of sitemap endpoints.
+
+Builds the CKAN application from a config file and replays crawler request
+patterns with `ckanext.sitemap.tests.crawler_load.CrawlerLoad`: concurrent
+fetches of the sitemap index, conditional re-fetches and fan-out over child
+sitemaps. Requests go through the whole WSGI stack in-process, so the
+reported RSS is the memory of a single worker.
+
+Usage:
+
+    python benchmarks/load.py -c /etc/ckan/default/ckan.ini [--concurrency 8] [--requests 200]
+"""
+
+from __future__ import annotations
+
+import argparse
+
+from ckanext.sitemap.tests.crawler_load import CrawlerLoad
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-c", "--config", required=True, help="CKAN config file")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=1, help="fan-out rounds")
+    args = parser.parse_args()
+
+    from ckan.cli import load_config
+    from ckan.config.middleware import make_app
+
+    app = make_app(load_config(args.config))
+    load = CrawlerLoad(app.test_client, args.concurrency, count_queries=True)
+
+    scenarios = {
+        "burst": lambda: load.burst("/sitemap.xml", args.requests),
+        "refetch": lambda: load.refetch("/sitemap.xml", args.requests),
+        "fanout": lambda: load.fanout("/sitemap.xml", args.rounds),
+    }
+    for name, scenario in scenarios.items():
+        report = scenario()
+        print(f"{name}:")
+        for key, value in report.as_dict().items():
+            print(f"    {key:<16}{value}")
+
+
+if __name__ == "__main__":
+    main()
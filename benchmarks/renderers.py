@@ -0,0 +1,66 @@
+"""Throughput benchmark of the sitemap serializers.
+
+Renders the same shard with every engine from `ckanext.sitemap.renderers`
+and reports rendered URLs per second. URLs are synthetic but shaped like real
+dataset URLs with hreflang alternates for several languages.
+
+Usage:
+
+    python benchmarks/renderers.py [--urls 50000] [--languages 3] [--repeat 3]
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+from ckanext.sitemap.renderers import RENDERERS, SitemapUrl
+
+
+SITE_URL = "https://data.example.com"
+
+
+def make_urls(count: int, languages: int) -> list[SitemapUrl]:
+    langs = ["en", "fr", "de", "es", "uk", "pt_BR", "zh_Hans_CN"][:languages]
+    urls = []
+    for index in range(count):
+        path = f"/dataset/dataset-{index:08d}"
+        alternates = ()
+        if langs:
+            alternates = (("x-default", SITE_URL + path),) + tuple(
+                (lang, f"{SITE_URL}/{lang}{path}") for lang in langs
+            )
+        urls.append(SitemapUrl(
+            SITE_URL + path, "2024-06-01", "daily", "0.5", alternates
+        ))
+    return urls
+
+
+def measure(engine: str, urls: list[SitemapUrl], repeat: int) -> float:
+    renderer = RENDERERS[engine]()
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        renderer.render_urlset(urls, comment="========== Datasets ==========")
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--urls", type=int, default=50000)
+    parser.add_argument("--languages", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    urls = make_urls(args.urls, args.languages)
+    timings = {engine: measure(engine, urls, args.repeat) for engine in RENDERERS}
+
+    print(f"urls:       {args.urls} ({args.languages} languages)")
+    for engine, duration in timings.items():
+        print(f"{engine + ':':<12}{args.urls / duration:,.0f} URLs/sec")
+    print(f"speedup:    {timings['lxml'] / timings['bytes']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Startup benchmark of the sitemap plugin.
+
+Measures how much time and memory importing `ckanext.sitemap.plugin` adds on
+top of `ckan.plugins.toolkit`, which every CKAN plugin imports anyway. Every
+measurement runs in a fresh interpreter, so module caches do not leak between
+runs.
+
+Usage:
+
+    python benchmarks/startup.py [--runs 10]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+
+HEAVY_MODULES = [
+    "lxml.etree",
+    "requests",
+    "ckanext.sitemap.utils",
+    "ckanext.sitemap.middlewares",
+    "ckanext.sitemap.views",
+]
+
+PROBE = """
+import json, resource, sys, time, tracemalloc
+
+import ckan.plugins.toolkit
+
+modules = set(sys.modules)
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+tracemalloc.start()
+started = time.perf_counter()
+import {module}
+duration = time.perf_counter() - started
+_, peak = tracemalloc.get_traced_memory()
+
+print(json.dumps({{
+    "duration": duration,
+    "peak": peak,
+    "rss": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss,
+    "loaded": sorted(set(sys.modules) - modules),
+}}))
+"""
+
+
+def measure(module: str) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE.format(module=module)],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--module", default="ckanext.sitemap.plugin")
+    args = parser.parse_args()
+
+    results = [measure(args.module) for _ in range(args.runs)]
+    durations = [r["duration"] * 1000 for r in results]
+
+    print(f"module:         {args.module}")
+    print(f"runs:           {args.runs}")
+    print(f"import time:    median {statistics.median(durations):.2f} ms, "
+          f"min {min(durations):.2f} ms")
+    print(f"traced memory:  {results[-1]['peak'] / 1024:.1f} KiB peak")
+    print(f"RSS growth:     {results[-1]['rss']} KiB")
+    print(f"new modules:    {len(results[-1]['loaded'])}")
+
+    heavy = [m for m in HEAVY_MODULES if m in results[-1]["loaded"]]
+    print(f"heavy modules:  {', '.join(heavy) or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Crawler access analytics of sitemap endpoints.
+
+Every worker aggregates requests to sitemap files in memory, grouped by the
+crawler that made them and the requested file. Counters are flushed into
+Redis at most once per `ckanext.sitemap.crawler_stats_flush_interval` seconds
+and when the worker exits, so serving a sitemap never waits for a write.
+"""
+
+from __future__ import annotations
+
+import atexit
+import logging
+import re
+import threading
+import time
+
+from functools import lru_cache
+
+
+log = logging.getLogger(__name__)
+
+# Checked in order, the first matching pattern names the crawler
+CRAWLERS = [
+    ("Googlebot", re.compile(r"googlebot|google-inspectiontool|storebot-google", re.I)),
+    ("Bingbot", re.compile(r"bingbot|bingpreview|msnbot", re.I)),
+    ("YandexBot", re.compile(r"yandex", re.I)),
+    ("Baiduspider", re.compile(r"baiduspider", re.I)),
+    ("DuckDuckBot", re.compile(r"duckduckbot", re.I)),
+    ("Applebot", re.compile(r"applebot", re.I)),
+    ("Other bots", re.compile(r"bot|crawl|spider|slurp|fetch", re.I)),
+]
+OTHER = "Other"
+
+# File name of requests for missing shards, unknown sections and failures
+OTHER_SHARDS = "other"
+
+# Positions of values in a counter list
+REQUESTS, NOT_MODIFIED, BYTES, DURATION = range(4)
+
+
+@lru_cache(maxsize=1024)
+def classify_user_agent(user_agent: str) -> str:
+    """Get the name of the crawler family from the User-Agent header.
+
+    Crawlers send the same few User-Agent strings over and over, so results
+    are cached and the patterns run once per distinct string.
+
+    Args:
+        user_agent (str): value of the User-Agent header.
+
+    Returns:
+        str: crawler name, eg. `Googlebot`, or `Other` for regular clients.
+    """
+    for name, pattern in CRAWLERS:
+        if pattern.search(user_agent):
+            return name
+    return OTHER
+
+
+class CrawlerCounters:
+    """In-process counters of sitemap requests.
+
+    Counters are keyed by crawler name and sitemap file and hold the number
+    of requests, the number of `304 Not Modified` responses, sent bytes and
+    total processing time in seconds.
+    """
+
+    def __init__(self, flush_interval: int):
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._counters: dict[tuple[str, str], list] = {}
+        self._flushed_at = time.monotonic()
+
+    def record(self, agent: str, name: str, status: int, size: int, duration: float):
+        """Count a single request.
+
+        Args:
+            agent (str): crawler name.
+            name (str): name of the requested sitemap file.
+            status (int): HTTP status of the response.
+            size (int): number of bytes in the response body.
+            duration (float): processing time in seconds.
+        """
+        with self._lock:
+            counter = self._counters.get((agent, name))
+            if counter is None:
+                counter = self._counters[(agent, name)] = [0, 0, 0, 0.0]
+            counter[REQUESTS] += 1
+            if status == 304:
+                counter[NOT_MODIFIED] += 1
+            counter[BYTES] += size
+            counter[DURATION] += duration
+            due = time.monotonic() - self._flushed_at >= self.flush_interval
+
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Move accumulated counters into the shared storage."""
+        from ckanext.sitemap import stats
+
+        with self._lock:
+            counters, self._counters = self._counters, {}
+            self._flushed_at = time.monotonic()
+
+        if not counters:
+            return
+        try:
+            stats.record_crawler_requests(counters)
+        except Exception:
+            # Analytics must never break sitemap serving
+            log.exception("Cannot flush sitemap crawler statistics")
+
+
+_crawler_counters: CrawlerCounters | None = None
+
+
+def get_crawler_counters() -> CrawlerCounters:
+    """Get crawler counters of the current worker."""
+    from ckanext.sitemap import configs
+
+    global _crawler_counters
+    if _crawler_counters is None:
+        _crawler_counters = CrawlerCounters(configs.sitemap_crawler_stats_flush_interval())
+        atexit.register(_crawler_counters.flush)
+    return _crawler_counters
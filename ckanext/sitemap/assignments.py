@@ -0,0 +1,253 @@
+"""Stable assignment of sitemap entries to shards.
+
+When a section is split into shards by position, a single entry added near
+the start shifts every following entry into the next shard, and crawlers have
+to download every shard again. Generated sitemaps keep the shard of every
+entry in the `sitemap_shard_entry` table instead:
+
+- an entry stays in its shard until it is removed from the section
+- a new entry goes to the first shard that has room, or to a new shard
+- entries are moved only out of a shard that is over `ckanext.sitemap.shard_size`,
+  or out of a shard that is over `ckanext.sitemap.shard_max_bytes` when it's
+  rendered
+
+Adding or removing an entry therefore changes exactly one shard.
+
+`update` compares the complete list of section entries with the stored
+shards. Incremental runs use `add` and `remove` with the names of modified
+entries instead, so the section is not enumerated.
+"""
+
+from __future__ import annotations
+
+from collections import Counter
+from typing import Collection, Iterable
+
+from ckanext.sitemap import utils
+from ckanext.sitemap.entries import SitemapEntry
+
+
+# Number of names in a single DELETE query
+DELETE_BATCH_SIZE = 1000
+
+
+class ShardAssignment:
+    """Shards of entries of a single section.
+
+    Attributes:
+        section (str): name of the sitemap section.
+        shard_size (int): maximum number of entries in a shard.
+        shards (dict[str, int]): mapping of entry name to its shard.
+    """
+
+    def __init__(self, section: str, shard_size: int, shards: dict[str, int]):
+        self.section = section
+        self.shard_size = shard_size
+        self.shards = shards
+        self._assigned: dict[str, int] = {}
+        self._removed: set[str] = set()
+
+    @classmethod
+    def load(cls, section: str, shard_size: int) -> ShardAssignment:
+        """Load stored shards of the section entries.
+
+        Args:
+            section (str): name of the sitemap section.
+            shard_size (int): maximum number of entries in a shard.
+
+        Returns:
+            ShardAssignment: the assignment.
+        """
+        from ckan import model
+        from ckanext.sitemap.model import SitemapShardEntry
+
+        query = (
+            model.Session.query(SitemapShardEntry.name, SitemapShardEntry.shard)
+            .filter(SitemapShardEntry.section == section)
+        )
+        return cls(section, shard_size, dict(query))
+
+    def update(
+        self,
+        entries: Iterable[SitemapEntry],
+        limit: int,
+        closed: Collection[int] = (),
+    ) -> tuple[dict[int, list[SitemapEntry]], set[int]]:
+        """Assign shards to the current entries of the section.
+
+        Args:
+            entries (Iterable[SitemapEntry]): all entries of the section.
+            limit (int): maximum number of entries in the sitemap of the section.
+            closed (Collection[int]): shards that don't get new entries, eg.
+                because they have reached the byte budget.
+
+        Returns:
+            tuple[dict[int, list[SitemapEntry]], set[int]]: entries grouped by
+                their shard and numbers of shards whose entries have changed.
+        """
+        members: dict[int, list[SitemapEntry]] = {}
+        new: list[SitemapEntry] = []
+        seen: set[str] = set()
+        for entry in entries:
+            seen.add(entry.name)
+            shard = self.shards.get(entry.name)
+            if shard is None:
+                new.append(entry)
+            else:
+                members.setdefault(shard, []).append(entry)
+
+        changed = set()
+        for name in set(self.shards) - seen:
+            changed.add(self._remove(name))
+
+        # A lowered limit removes the entries that come last in the section order
+        kept = sum(len(items) for items in members.values())
+        if kept > limit:
+            ordered = sorted(
+                (entry.name for items in members.values() for entry in items)
+            )
+            for name in ordered[limit:]:
+                changed.add(self._remove(name))
+            members = {
+                shard: [entry for entry in items if entry.name in self.shards]
+                for shard, items in members.items()
+            }
+            kept = limit
+        new = new[:max(0, limit - kept)]
+
+        # Shards over the size cap give their last entries away
+        for shard, items in members.items():
+            if len(items) > self.shard_size:
+                new = items[self.shard_size:] + new
+                del items[self.shard_size:]
+                changed.add(shard)
+
+        sizes = Counter({shard: len(items) for shard, items in members.items()})
+        changed |= self._place([entry.name for entry in new], sizes, closed)
+        for entry in new:
+            members.setdefault(self.shards[entry.name], []).append(entry)
+
+        for shard in changed & set(members):
+            members[shard].sort(key=lambda entry: entry.name)
+
+        return {shard: items for shard, items in members.items() if items}, changed
+
+    def add(
+        self,
+        names: Iterable[str],
+        limit: int,
+        closed: Collection[int] = (),
+    ) -> set[int]:
+        """Assign shards to new entries without the complete list of entries.
+
+        Entries that are over the limit of the section are not added. Like
+        `update`, a lowered limit removes the entries that come last and a
+        lowered shard size moves the last entries of a shard to other shards.
+
+        Args:
+            names (Iterable[str]): names of entries added to the section.
+            limit (int): maximum number of entries in the sitemap of the section.
+            closed (Collection[int]): shards that don't get new entries.
+
+        Returns:
+            set[int]: numbers of shards whose entries have changed.
+        """
+        changed = set()
+        if len(self.shards) > limit:
+            for name in sorted(self.shards)[limit:]:
+                changed.add(self._remove(name))
+
+        new = [name for name in names if name not in self.shards]
+        new = new[:max(0, limit - len(self.shards))]
+
+        sizes = Counter(self.shards.values())
+        oversized = {shard for shard, size in sizes.items() if size > self.shard_size}
+        if oversized:
+            for shard, names in self.get_members(oversized).items():
+                new = names[self.shard_size:] + new
+                sizes[shard] = self.shard_size
+                changed.add(shard)
+
+        return changed | self._place(new, sizes, closed)
+
+    def remove(self, names: Iterable[str]) -> set[int]:
+        """Release shards of entries removed from the section.
+
+        Args:
+            names (Iterable[str]): names of entries, unknown ones are ignored.
+
+        Returns:
+            set[int]: numbers of shards whose entries have changed.
+        """
+        return {self._remove(name) for name in names if name in self.shards}
+
+    def get_members(self, shards: Collection[int]) -> dict[int, list[str]]:
+        """Get names of entries in the given shards.
+
+        Args:
+            shards (Collection[int]): numbers of shards.
+
+        Returns:
+            dict[int, list[str]]: sorted names of entries grouped by their shard.
+        """
+        members: dict[int, list[str]] = {}
+        for name, shard in self.shards.items():
+            if shard in shards:
+                members.setdefault(shard, []).append(name)
+        for names in members.values():
+            names.sort()
+        return members
+
+    def move(self, entries: Iterable[SitemapEntry], shard: int):
+        """Move entries to another shard.
+
+        Args:
+            entries (Iterable[SitemapEntry]): assigned entries of the section.
+            shard (int): number of the target shard.
+        """
+        for entry in entries:
+            self.shards[entry.name] = shard
+            self._assigned[entry.name] = shard
+
+    def save(self):
+        """Store changed shards of entries in the database."""
+        from ckan import model
+        from ckanext.sitemap.model import SitemapShardEntry
+
+        table = SitemapShardEntry.__table__
+        moved = self._removed | set(self._assigned)
+        for names in utils.iter_batches(sorted(moved), DELETE_BATCH_SIZE):
+            model.Session.execute(
+                table.delete()
+                .where(table.c.section == self.section)
+                .where(table.c.name.in_(names))
+            )
+
+        if self._assigned:
+            model.Session.execute(table.insert(), [
+                {"section": self.section, "name": name, "shard": shard}
+                for name, shard in self._assigned.items()
+            ])
+
+        model.Session.commit()
+        self._assigned = {}
+        self._removed = set()
+
+    def _place(self, names: list[str], sizes: Counter[int], closed: Collection[int]) -> set[int]:
+        """Put entries into the first shards that have room."""
+        changed = set()
+        shard = 1
+        for name in names:
+            while shard in closed or sizes[shard] >= self.shard_size:
+                shard += 1
+            sizes[shard] += 1
+            self.shards[name] = shard
+            self._assigned[name] = shard
+            changed.add(shard)
+        return changed
+
+    def _remove(self, name: str) -> int:
+        shard = self.shards.pop(name)
+        self._assigned.pop(name, None)
+        self._removed.add(name)
+        return shard
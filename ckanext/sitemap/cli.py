@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import click
+
+from ckan.plugins import toolkit as tk
+
+
+@click.group(short_help="Sitemap management commands")
+def sitemap():
+    pass
+
+
+@sitemap.command()
+@click.option(
+    "--full",
+    is_flag=True,
+    help="Check every shard instead of only those with modified entities",
+)
+@click.pass_context
+def generate(ctx: click.Context, full: bool):
+    """Generate sitemap files into the sitemap storage folder.
+
+    By default only shards that contain entities modified since their previous
+    generation are rewritten, so the command is cheap enough to run hourly.
+    """
+    from ckanext.sitemap.generator import SitemapGenerator
+
+    flask_app = ctx.meta["flask_app"]
+    with flask_app.test_request_context():
+        try:
+            report = SitemapGenerator().generate(full=full)
+        except tk.ValidationError as e:
+            tk.error_shout(e.error_summary)
+            raise click.Abort()
+
+    click.secho(f"Written shards: {', '.join(report['written']) or '-'}", fg="green")
+    click.echo(f"Removed shards: {', '.join(report['removed']) or '-'}")
+    click.echo(f"Unchanged shards: {len(report['unchanged']) + len(report['skipped'])}")
+    for section, count in report["duplicates"].items():
+        click.secho(f"Duplicate URLs in {section}: {count}", fg="yellow")
+
+
+def get_commands():
+    return [sitemap]
@@ -2,9 +2,9 @@
 
 from __future__ import annotations
 
-import ckan.plugins.toolkit as tk
+import os
 
-from ckanext.sitemap.utils import get_sitemap_config
+import ckan.plugins.toolkit as tk
 
 
 SITEMAP_DEFAULT_LIMIT = "ckanext.sitemap.default_limit"
@@ -12,6 +12,32 @@ SITEMAP_DEFAULT_PRIORITY = "ckanext.sitemap.default_priority"
 SITEMAP_DEFAULT_CHANGEFREQ = "ckanext.sitemap.default_changefreq"
 SITEMAP_INDEXABLE_ENDPOINTS = "ckanext.sitemap.indexable_endpoints"
 SITEMAP_ENABLE_INDEXING_BLOCK = "ckanext.sitemap.enable_indexing_block"
+SITEMAP_SHARD_SIZE = "ckanext.sitemap.shard_size"
+SITEMAP_SHARD_MAX_BYTES = "ckanext.sitemap.shard_max_bytes"
+SITEMAP_DEDUP_EXACT_LIMIT = "ckanext.sitemap.dedup_exact_limit"
+SITEMAP_STORAGE_PATH = "ckanext.sitemap.storage_path"
+SITEMAP_DATASETS_SOURCE = "ckanext.sitemap.datasets_source"
+SITEMAP_DATABASE_BATCH_SIZE = "ckanext.sitemap.database_batch_size"
+SITEMAP_DETECT_TRANSLATIONS = "ckanext.sitemap.detect_translations"
+SITEMAP_RECENT_HOURS = "ckanext.sitemap.recent_hours"
+SITEMAP_RECENT_SIZE = "ckanext.sitemap.recent_size"
+SITEMAP_RECENT_REFRESH = "ckanext.sitemap.recent_refresh"
+SITEMAP_RENDERER = "ckanext.sitemap.renderer"
+SITEMAP_SERVE_MODE = "ckanext.sitemap.serve_mode"
+SITEMAP_ACCEL_REDIRECT_LOCATION = "ckanext.sitemap.accel_redirect_location"
+SITEMAP_CRAWLER_STATS = "ckanext.sitemap.crawler_stats"
+SITEMAP_CRAWLER_STATS_FLUSH_INTERVAL = "ckanext.sitemap.crawler_stats_flush_interval"
+SITEMAP_CLIENT_RATE_LIMIT = "ckanext.sitemap.client_rate_limit"
+SITEMAP_CLIENT_BURST = "ckanext.sitemap.client_burst"
+SITEMAP_GLOBAL_RATE_LIMIT = "ckanext.sitemap.global_rate_limit"
+SITEMAP_GLOBAL_BURST = "ckanext.sitemap.global_burst"
+SITEMAP_RATE_LIMIT_BACKEND = "ckanext.sitemap.rate_limit_backend"
+SITEMAP_PREWARM = "ckanext.sitemap.prewarm"
+SITEMAP_PREWARM_TIMEOUT = "ckanext.sitemap.prewarm_timeout"
+SITEMAP_PREWARM_INTERVAL = "ckanext.sitemap.prewarm_interval"
+SITEMAP_PRIORITY_SOURCE = "ckanext.sitemap.priority_source"
+SITEMAP_PRIORITY_CACHE_TTL = "ckanext.sitemap.priority_cache_ttl"
+SITEMAP_EXPORT_FORMATS = "ckanext.sitemap.export_formats"
 
 SITEMAP_SECTIONS = [
     "pages",
@@ -20,6 +46,18 @@ SITEMAP_SECTIONS = [
     "groups"
 ]
 
+SITEMAP_SERVE_MODES = [
+    "python",
+    "x-sendfile",
+    "x-accel-redirect",
+]
+
+SITEMAP_PRIORITY_SOURCES = [
+    "static",
+    "views",
+    "downloads",
+]
+
 SITEMAP_FREQUENCY_OPTIONS = [
     "always",
     "hourly",
@@ -30,6 +68,15 @@ SITEMAP_FREQUENCY_OPTIONS = [
     "never",
 ]
 
+# Maximum number of URLs allowed in a single sitemap file by the protocol
+SITEMAP_MAX_URLS = 50000
+
+# Maximum size of an uncompressed sitemap file allowed by the protocol
+SITEMAP_MAX_BYTES = 50 * 1024 * 1024
+
+# Number of entries whose translations are looked up with a single query
+SITEMAP_TRANSLATIONS_BATCH_SIZE = 1000
+
 SITEMAP_NS = "http://www.sitemaps.org/schemas/sitemap/0.9"
 XHTML_NS = "https://www.w3.org/1999/xhtml"
 
@@ -77,6 +124,8 @@ def sitemap_include_hreflang() -> bool:
     attribute should be included in the sitemap.
     The default value is False.
     """
+    from ckanext.sitemap.utils import get_sitemap_config
+
     return get_sitemap_config("include_hreflang", False)
 
 
@@ -104,6 +153,271 @@ def sitemap_enable_indexing_block() -> bool:
     return tk.asbool(tk.config.get(SITEMAP_ENABLE_INDEXING_BLOCK, False))
 
 
+def sitemap_shard_size() -> int:
+    """Get the maximum number of URLs in a single sitemap file.
+
+    Sections with more entities are split into several files (shards) that are
+    listed in the sitemap index. The value can't exceed the 50,000 URLs allowed
+    by the sitemap protocol, which is also the default value.
+    """
+    return min(
+        int(tk.config.get(SITEMAP_SHARD_SIZE, SITEMAP_MAX_URLS)),
+        SITEMAP_MAX_URLS,
+    )
+
+
+def sitemap_shard_max_bytes() -> int:
+    """Get the maximum size of a single generated sitemap file in bytes.
+
+    A generated shard is cut once its uncompressed size reaches the budget,
+    and the remaining URLs go to another shard. The value can't exceed the
+    50 MiB allowed by the sitemap protocol, which is also the default value.
+    """
+    return min(
+        int(tk.config.get(SITEMAP_SHARD_MAX_BYTES, SITEMAP_MAX_BYTES)),
+        SITEMAP_MAX_BYTES,
+    )
+
+
+def sitemap_dedup_exact_limit() -> int:
+    """Get the number of URLs checked for duplicates with an in-memory set.
+
+    Once the generator has seen more URLs, it switches to a Bloom filter backed
+    by a temporary SQLite file, which keeps memory usage bounded.
+    The default value is 100000.
+    """
+    return int(tk.config.get(SITEMAP_DEDUP_EXACT_LIMIT, 100000))
+
+
+def sitemap_storage_path() -> str | None:
+    """Get the folder for generated sitemap files.
+
+    Files are written there by the `ckan sitemap generate` command. By default
+    the `sitemap` folder inside `ckan.storage_path` is used. None is returned
+    if neither option is configured.
+    """
+    path = tk.config.get(SITEMAP_STORAGE_PATH)
+    if path:
+        return path
+
+    storage_path = tk.config.get("ckan.storage_path")
+    return os.path.join(storage_path, "sitemap") if storage_path else None
+
+
+def sitemap_datasets_source() -> str:
+    """Get the source of datasets for the sitemap.
+
+    Possible values:
+    - "search": datasets are read with `package_search` from the search index
+    - "database": datasets are read from the `package` table, which keeps the
+      sitemap available and cheap while Solr is reindexed or under load
+    The default value is "search".
+    """
+    return tk.config.get(SITEMAP_DATASETS_SOURCE, "search")
+
+
+def sitemap_database_batch_size() -> int:
+    """Get the number of rows fetched per query in the "database" datasets source.
+
+    The default value is 5000.
+    """
+    return int(tk.config.get(SITEMAP_DATABASE_BATCH_SIZE, 5000))
+
+
+def sitemap_detect_translations() -> bool:
+    """Check if hreflang links should be limited to existing translations.
+
+    When enabled, alternate links are emitted only for the default locale and
+    languages that an entity has translated content in. Otherwise every
+    language from `ckan.locales_offered` is listed for every entity.
+    The default value is False.
+    """
+    return tk.asbool(tk.config.get(SITEMAP_DETECT_TRANSLATIONS, False))
+
+
+def sitemap_recent_hours() -> int:
+    """Get the time window of the recently changed datasets sitemap.
+
+    Datasets modified within the last N hours are listed in
+    `/sitemap/recent.xml`. 0 disables the recent sitemap.
+    The default value is 24.
+    """
+    return int(tk.config.get(SITEMAP_RECENT_HOURS, 24))
+
+
+def sitemap_recent_size() -> int:
+    """Get the maximum number of datasets in the recently changed datasets sitemap.
+
+    The default value is 1000.
+    """
+    return int(tk.config.get(SITEMAP_RECENT_SIZE, 1000))
+
+
+def sitemap_recent_refresh() -> int:
+    """Get the interval in seconds between re-seeding the recent changes buffer.
+
+    Modification notifications reach only the worker that made the change, so
+    every worker periodically re-reads recent changes from the search index.
+    The default value is 300.
+    """
+    return int(tk.config.get(SITEMAP_RECENT_REFRESH, 300))
+
+
+def sitemap_renderer() -> str:
+    """Get the engine that serializes sitemap shards.
+
+    Available engines are:
+    - "lxml": builds an element tree with lxml
+    - "bytes": concatenates escaped byte fragments, several times faster
+    Both produce identical documents. The default value is "lxml".
+    """
+    return tk.config.get(SITEMAP_RENDERER, "lxml")
+
+
+def sitemap_serve_mode() -> str:
+    """Get the way generated sitemap files are sent to clients.
+
+    Available modes are:
+    - "python": the worker sends the file, with support of range requests
+    - "x-sendfile": the `X-Sendfile` header hands the file over to the web
+      server (Apache mod_xsendfile, lighttpd)
+    - "x-accel-redirect": the `X-Accel-Redirect` header hands the file over
+      to nginx
+    The default value is "python".
+    """
+    mode = tk.config.get(SITEMAP_SERVE_MODE, "python")
+    return mode if mode in SITEMAP_SERVE_MODES else "python"
+
+
+def sitemap_accel_redirect_location() -> str:
+    """Get the internal nginx location that maps to the sitemap storage folder.
+
+    Used by the "x-accel-redirect" serve mode. The default value is
+    "/sitemap-files/".
+    """
+    return tk.config.get(SITEMAP_ACCEL_REDIRECT_LOCATION, "/sitemap-files/")
+
+
+def sitemap_crawler_stats() -> bool:
+    """Check if requests to sitemap endpoints should be counted per crawler.
+
+    The default value is True.
+    """
+    return tk.asbool(tk.config.get(SITEMAP_CRAWLER_STATS, True))
+
+
+def sitemap_crawler_stats_flush_interval() -> int:
+    """Get the interval in seconds between flushes of crawler counters.
+
+    Every worker accumulates counters in memory and writes them to Redis at
+    most once per interval. The default value is 60.
+    """
+    return int(tk.config.get(SITEMAP_CRAWLER_STATS_FLUSH_INTERVAL, 60))
+
+
+def sitemap_client_rate_limit() -> int:
+    """Get the number of sitemap requests per minute allowed for a single client.
+
+    Clients over the limit get `429 Too Many Requests`. 0 disables the limit.
+    The default value is 0.
+    """
+    return int(tk.config.get(SITEMAP_CLIENT_RATE_LIMIT, 0))
+
+
+def sitemap_client_burst() -> int:
+    """Get the number of sitemap requests a single client can make at once.
+
+    The default value is 10.
+    """
+    return int(tk.config.get(SITEMAP_CLIENT_BURST, 10))
+
+
+def sitemap_global_rate_limit() -> int:
+    """Get the number of sitemap requests per minute allowed for all clients.
+
+    Requests over the limit get `503 Service Unavailable`. 0 disables the limit.
+    The default value is 0.
+    """
+    return int(tk.config.get(SITEMAP_GLOBAL_RATE_LIMIT, 0))
+
+
+def sitemap_global_burst() -> int:
+    """Get the number of sitemap requests all clients can make at once.
+
+    The default value is 50.
+    """
+    return int(tk.config.get(SITEMAP_GLOBAL_BURST, 50))
+
+
+def sitemap_rate_limit_backend() -> str:
+    """Get the storage of rate limits and rendering markers.
+
+    Available backends are:
+    - "memory": every worker has its own limits
+    - "redis": limits are shared by all workers
+    The default value is "memory".
+    """
+    return tk.config.get(SITEMAP_RATE_LIMIT_BACKEND, "memory")
+
+
+def sitemap_prewarm() -> bool:
+    """Check if sitemap files should be generated in the background.
+
+    Generation is enqueued when CKAN starts, when sitemap settings are saved
+    or reset, and when generated files are older than the prewarm interval.
+    The default value is False.
+    """
+    return tk.asbool(tk.config.get(SITEMAP_PREWARM, False))
+
+
+def sitemap_prewarm_timeout() -> int:
+    """Get the maximum duration of the background generation in seconds.
+
+    The default value is 3600.
+    """
+    return int(tk.config.get(SITEMAP_PREWARM_TIMEOUT, 3600))
+
+
+def sitemap_prewarm_interval() -> int:
+    """Get the age in seconds after which generated files are refreshed.
+
+    The refresh is enqueued by the next sitemap request. 0 disables it.
+    The default value is 3600.
+    """
+    return int(tk.config.get(SITEMAP_PREWARM_INTERVAL, 3600))
+
+
+def sitemap_priority_source() -> str:
+    """Get the source of dataset priorities.
+
+    Available sources are:
+    - "static": the `datasets_priority` setting
+    - "views": number of visits of the dataset page
+    - "downloads": number of downloads of the dataset resources
+    Popularity sources require CKAN page view tracking.
+    The default value is "static".
+    """
+    source = tk.config.get(SITEMAP_PRIORITY_SOURCE, "static")
+    return source if source in SITEMAP_PRIORITY_SOURCES else "static"
+
+
+def sitemap_priority_cache_ttl() -> int:
+    """Get the number of seconds priorities computed from popularity are cached.
+
+    The default value is 3600.
+    """
+    return int(tk.config.get(SITEMAP_PRIORITY_CACHE_TTL, 3600))
+
+
+def sitemap_export_formats() -> list[str]:
+    """Get plain formats written by the generator next to every XML shard.
+
+    Available formats are "txt" and "jsonl". Sitemaps rendered on request are
+    available in every format. The default value is an empty list.
+    """
+    return tk.aslist(tk.config.get(SITEMAP_EXPORT_FORMATS, ""))
+
+
 def sitemap_date_format() -> str:
     """Get the date format for the sitemap entries.
     
@@ -113,4 +427,6 @@ def sitemap_date_format() -> str:
     - "iso": ISO 8601 format (YYYY-MM-DDTHH:MM:SSZ)
     The default value is "default".
     """
+    from ckanext.sitemap.utils import get_sitemap_config
+
     return get_sitemap_config("date_format", "default")
@@ -0,0 +1,179 @@
+"""Detection of URLs listed by more than one sitemap entry.
+
+Sections are rendered independently, so the same URL can be produced twice,
+eg. by a custom page of `ckanext.sitemap.indexable_endpoints` and a dataset,
+or by entries with colliding `original_path` values. The generator passes the
+URL of every entry through `UrlDeduplicator` and lists only its first
+occurrence.
+
+Seen URLs are kept in an exact in-memory set until it holds
+`ckanext.sitemap.dedup_exact_limit` URLs. After that they are moved to a
+temporary SQLite file, and a Bloom filter in front of it answers most lookups
+without touching the disk. The file is queried only when the filter reports a
+possible match, so results are exact while memory stays bounded.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import math
+import os
+import sqlite3
+import tempfile
+
+from typing import Iterator
+
+
+# Probability of a false match of a single Bloom filter
+BLOOM_ERROR_RATE = 0.01
+
+# Number of URLs inserted into the SQLite file with a single query
+STORE_BATCH_SIZE = 10000
+
+
+class BloomFilter:
+    """Bloom filter of a fixed capacity.
+
+    Args:
+        capacity (int): number of items the filter is sized for.
+        error_rate (float): probability of a false match at full capacity.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = BLOOM_ERROR_RATE):
+        self.capacity = capacity
+        self.size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def add(self, item: str) -> bool:
+        """Add the item to the filter.
+
+        Returns:
+            bool: True if the item may have been added before.
+        """
+        present = True
+        for position in self._positions(item):
+            byte, bit = divmod(position, 8)
+            if not self._bits[byte] & (1 << bit):
+                present = False
+                self._bits[byte] |= 1 << bit
+        if not present:
+            self.count += 1
+        return present
+
+    def __contains__(self, item: str) -> bool:
+        return all(
+            self._bits[position // 8] & (1 << position % 8)
+            for position in self._positions(item)
+        )
+
+    def _positions(self, item: str) -> Iterator[int]:
+        # Double hashing derives every position from two halves of one digest
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hashes):
+            yield (first + i * second) % self.size
+
+
+class UrlDeduplicator:
+    """Memory-bounded set of URLs seen during a sitemap generation.
+
+    Example:
+        >>> with UrlDeduplicator(1000) as seen:
+        ...     seen.add("http://localhost/dataset/a")
+        ...     seen.add("http://localhost/dataset/a")
+        True
+        False
+
+    Args:
+        exact_limit (int): number of URLs kept in memory before switching to
+            the Bloom filter and the SQLite file.
+    """
+
+    def __init__(self, exact_limit: int):
+        self.exact_limit = exact_limit
+        self.count = 0
+        self._exact: set[str] | None = set()
+        self._filters: list[BloomFilter] = []
+        self._pending: set[str] = set()
+        self._db: sqlite3.Connection | None = None
+        self._db_path: str | None = None
+
+    def __enter__(self) -> UrlDeduplicator:
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def add(self, url: str) -> bool:
+        """Remember the URL.
+
+        Args:
+            url (str): absolute URL of a sitemap entry.
+
+        Returns:
+            bool: True if the URL is seen for the first time.
+        """
+        if self._exact is not None:
+            if url in self._exact:
+                return False
+            self._exact.add(url)
+            self.count += 1
+            if len(self._exact) > self.exact_limit:
+                self._spill()
+            return True
+
+        maybe_seen = any(url in bloom for bloom in self._filters[:-1])
+        maybe_seen = self._filters[-1].add(url) or maybe_seen
+        if maybe_seen and (url in self._pending or self._stored(url)):
+            return False
+
+        self.count += 1
+        self._pending.add(url)
+        if len(self._pending) >= STORE_BATCH_SIZE:
+            self._flush()
+        if self._filters[-1].count >= self._filters[-1].capacity:
+            # Every next filter is twice as large, so the number of filters
+            # grows with the logarithm of the number of URLs
+            self._filters.append(BloomFilter(self._filters[-1].capacity * 2))
+        return True
+
+    def close(self):
+        """Remove the temporary SQLite file."""
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+        if self._db_path is not None:
+            os.remove(self._db_path)
+            self._db_path = None
+
+    def _spill(self):
+        """Move the exact set into the SQLite file and the Bloom filter."""
+        fd, self._db_path = tempfile.mkstemp(prefix="sitemap-urls-", suffix=".sqlite")
+        os.close(fd)
+        self._db = sqlite3.connect(self._db_path)
+        self._db.execute("PRAGMA journal_mode = OFF")
+        self._db.execute("PRAGMA synchronous = OFF")
+        self._db.execute("CREATE TABLE url (loc TEXT PRIMARY KEY) WITHOUT ROWID")
+
+        bloom = BloomFilter(max(self.exact_limit, 1) * 2)
+        for url in self._exact:
+            bloom.add(url)
+        self._filters.append(bloom)
+        self._pending = self._exact
+        self._exact = None
+        self._flush()
+
+    def _flush(self):
+        self._db.executemany(
+            "INSERT OR IGNORE INTO url (loc) VALUES (?)",
+            ((url,) for url in self._pending),
+        )
+        self._db.commit()
+        self._pending = set()
+
+    def _stored(self, url: str) -> bool:
+        cursor = self._db.execute("SELECT 1 FROM url WHERE loc = ?", (url,))
+        return cursor.fetchone() is not None
@@ -0,0 +1,71 @@
+"""Compact records passed through the sitemap generation pipeline."""
+
+from __future__ import annotations
+
+from typing import Any
+
+
+class SitemapEntry:
+    """A single entity that becomes a `<url>` element of the sitemap.
+
+    Enumerators produce these records instead of full action results, so the
+    pipeline keeps only the fields it needs to build a URL. `__slots__` removes
+    the per-instance `__dict__`, which keeps every record at a fixed, small size.
+
+    Attributes:
+        name (str): entity name, or endpoint name for static pages.
+        type (str): entity type used to build the `<type>.read` URL
+            (eg. dataset, organization, group) or `page` for static pages.
+        original_path (str | None): custom path that overrides the generated URL.
+        lastmod (str | None): ISO-formatted date of the last modification.
+            None means the entity has no modification date.
+    """
+
+    __slots__ = ("name", "type", "original_path", "lastmod")
+
+    def __init__(
+        self,
+        name: str,
+        type: str,
+        original_path: str | None = None,
+        lastmod: str | None = None,
+    ):
+        self.name = name
+        self.type = type
+        self.original_path = original_path
+        self.lastmod = lastmod
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any], type: str | None = None) -> SitemapEntry:
+        """Build an entry from an entity dictionary returned by a CKAN action.
+
+        Args:
+            data (dict[str, Any]): entity dictionary or Solr document.
+            type (str, optional): entity type used when data has no `type` key.
+
+        Returns:
+            SitemapEntry: compact record for the entity.
+        """
+        lastmod = data.get("metadata_modified")
+        if lastmod:
+            # Solr returns dates in UTC with the `Z` suffix, while the stored
+            # dictionaries use naive UTC timestamps.
+            lastmod = lastmod.rstrip("Z")
+
+        return cls(
+            data["name"],
+            data.get("type") or data.get("dataset_type") or type,
+            # Search results keep dataset extras under the `extras_` prefix
+            data.get("original_path") or data.get("extras_original_path"),
+            lastmod,
+        )
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, SitemapEntry):
+            return NotImplemented
+        return all(
+            getattr(self, slot) == getattr(other, slot) for slot in self.__slots__
+        )
+
+    def __repr__(self) -> str:
+        return f"<SitemapEntry {self.type}:{self.name}>"
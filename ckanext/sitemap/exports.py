@@ -0,0 +1,87 @@
+"""Plain formats of sitemap shards for internal consumers.
+
+Link checkers, CDN purge scripts and similar tools need only the list of URLs.
+Every shard is available in two formats that are cheaper to produce and to
+parse than XML:
+
+- "txt": one URL per line, the text sitemap format allowed by the protocol
+- "jsonl": JSON Lines with `loc`, `lastmod`, `section` and `alternates` of
+  every URL
+
+Exports are produced from the same `SitemapUrl` values as XML shards, so they
+list the same URLs and follow the same shard pagination.
+"""
+
+from __future__ import annotations
+
+import json
+
+from typing import Callable, Iterable, Iterator
+
+from ckanext.sitemap import utils
+from ckanext.sitemap.renderers import SitemapUrl
+
+
+# Number of lines joined into a single chunk of a streamed response
+CHUNK_SIZE = 1000
+
+
+def iter_text(urls: Iterable[SitemapUrl], section: str) -> Iterator[bytes]:
+    """Produce the text sitemap, one URL per line.
+
+    Args:
+        urls (Iterable[SitemapUrl]): URLs of the shard.
+        section (str): name of the sitemap section.
+
+    Yields:
+        bytes: chunks of UTF-8 encoded lines.
+    """
+    for batch in utils.iter_batches(urls, CHUNK_SIZE):
+        yield "".join(url.loc + "\n" for url in batch).encode("utf-8")
+
+
+def iter_json_lines(urls: Iterable[SitemapUrl], section: str) -> Iterator[bytes]:
+    """Produce JSON Lines, one object per URL.
+
+    Args:
+        urls (Iterable[SitemapUrl]): URLs of the shard.
+        section (str): name of the sitemap section.
+
+    Yields:
+        bytes: chunks of UTF-8 encoded lines.
+    """
+    for batch in utils.iter_batches(urls, CHUNK_SIZE):
+        yield "".join(
+            json.dumps({
+                "loc": url.loc,
+                "lastmod": url.lastmod,
+                "section": section,
+                "alternates": [
+                    {"hreflang": hreflang, "href": href}
+                    for hreflang, href in url.alternates
+                ],
+            }) + "\n"
+            for url in batch
+        ).encode("utf-8")
+
+
+# Format name -> content type and serializer
+EXPORT_FORMATS: dict[str, tuple[str, Callable[[Iterable[SitemapUrl], str], Iterator[bytes]]]] = {
+    "txt": ("text/plain; charset=utf-8", iter_text),
+    "jsonl": ("application/x-ndjson; charset=utf-8", iter_json_lines),
+}
+
+
+def render(format: str, urls: Iterable[SitemapUrl], section: str) -> bytes:
+    """Render the complete export of a shard.
+
+    Args:
+        format (str): name of the format, one of `EXPORT_FORMATS`.
+        urls (Iterable[SitemapUrl]): URLs of the shard.
+        section (str): name of the sitemap section.
+
+    Returns:
+        bytes: content of the export.
+    """
+    _content_type, serialize = EXPORT_FORMATS[format]
+    return b"".join(serialize(urls, section))
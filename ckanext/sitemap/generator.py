@@ -0,0 +1,544 @@
+"""Offline generation of sitemap files.
+
+The generator renders sitemap shards into the storage folder together with
+their gzip-compressed variants, exports in `ckanext.sitemap.export_formats` and
+a `manifest.json` file that describes them. When the manifest exists, sitemap
+views serve these files instead of rendering the sitemap on every request.
+
+Every entity keeps its shard between runs (see `assignments`), so adding or
+removing an entity changes a single shard. A shard is also cut when its size
+reaches `ckanext.sitemap.shard_max_bytes`: the remaining entities are moved to
+a new shard, and the full shard gets no new entities until it shrinks. Entities
+whose URL was already listed by a previous section or entity are dropped (see
+`dedup`). Regeneration is incremental: every shard keeps a high-water mark (the
+moment of its last generation), and only shards whose entities were added,
+removed or modified after it are rewritten. Sections that look entries up by
+name (see `SitemapSection.get_entries`) are not enumerated on such runs: only
+modified entries and the other members of their shards are read.
+
+A stale shard is rendered only if its content has changed: the generator hashes
+the URLs of the shard and compares the hash with the manifest. When they match,
+serialization, compression and the file swap are skipped, and the shard keeps
+its ETag and `Last-Modified`, so crawlers keep getting `304 Not Modified`. The
+same applies to the sitemap index.
+"""
+
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+
+from collections import Counter
+from datetime import datetime
+from typing import Any, Iterable, Iterator
+
+from ckan.plugins import toolkit as tk
+
+from ckanext.sitemap import configs, exports, stats, utils
+from ckanext.sitemap.assignments import ShardAssignment
+from ckanext.sitemap.dedup import UrlDeduplicator
+from ckanext.sitemap.entries import SitemapEntry
+from ckanext.sitemap.renderers import SitemapUrl, measure_url, measure_urlset
+from ckanext.sitemap.sections import SitemapSection, get_sections
+
+
+log = logging.getLogger(__name__)
+
+MANIFEST = "manifest.json"
+INDEX = "sitemap"
+
+
+class SitemapStorage:
+    """Folder with generated sitemap files and their manifest.
+
+    Attributes:
+        path (str | None): absolute path of the storage folder. None if
+            neither `ckanext.sitemap.storage_path` nor `ckan.storage_path`
+            is configured.
+    """
+
+    def __init__(self, path: str | None = None):
+        self.path = path or configs.sitemap_storage_path()
+
+    def file_path(self, name: str, compressed: bool = False, ext: str = "xml") -> str:
+        """Get the path of the sitemap file.
+
+        Args:
+            name (str): name of the shard or `sitemap` for the sitemap index.
+            compressed (bool): whether to return the gzip variant.
+            ext (str): extension of the file, `xml` or one of export formats.
+
+        Returns:
+            str: absolute path of the file.
+        """
+        filename = f"{name}.{ext}.gz" if compressed else f"{name}.{ext}"
+        return os.path.join(self.path, filename)
+
+    def get_manifest(self) -> dict[str, Any]:
+        """Load the manifest of generated files.
+
+        Returns:
+            dict[str, Any]: the manifest or an empty dictionary if nothing
+                was generated yet.
+        """
+        if not self.path:
+            return {}
+        try:
+            with open(os.path.join(self.path, MANIFEST)) as manifest:
+                return json.load(manifest)
+        except FileNotFoundError:
+            return {}
+
+    def save_manifest(self, manifest: dict[str, Any]):
+        self._write(MANIFEST, json.dumps(manifest, indent=2).encode("utf-8"))
+
+    def write(self, name: str, content: bytes, ext: str = "xml") -> str:
+        """Write the sitemap file and its gzip variant.
+
+        Both files are replaced atomically, so requests served during the
+        generation get either the previous or the new version.
+
+        Args:
+            name (str): name of the shard or `sitemap` for the sitemap index.
+            content (bytes): complete XML document or export of the shard.
+            ext (str): extension of the file, `xml` or one of export formats.
+
+        Returns:
+            str: ETag of the content.
+        """
+        # mtime=0 keeps the compressed file identical for identical content
+        self._write(f"{name}.{ext}.gz", gzip.compress(content, mtime=0))
+        self._write(f"{name}.{ext}", content)
+        return _etag(content)
+
+    def remove(self, name: str):
+        for ext in ["xml", *exports.EXPORT_FORMATS]:
+            for compressed in (False, True):
+                try:
+                    os.remove(self.file_path(name, compressed, ext))
+                except FileNotFoundError:
+                    pass
+
+    def _write(self, filename: str, content: bytes):
+        os.makedirs(self.path, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.path, prefix=f".{filename}.")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                tmp.write(content)
+            os.replace(tmp_path, os.path.join(self.path, filename))
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+
+class SitemapGenerator:
+    """Render sitemap shards and the sitemap index into the storage.
+
+    Example:
+        >>> report = SitemapGenerator().generate()
+        >>> report["written"]
+        ['datasets-3', 'groups-1']
+    """
+
+    def __init__(self, storage: SitemapStorage | None = None):
+        from ckanext.sitemap.views.sitemap import SitemapIndexView, SitemapView
+
+        self.storage = storage or SitemapStorage()
+        if not self.storage.path:
+            raise tk.ValidationError({
+                "storage_path": [
+                    "Set ckanext.sitemap.storage_path or ckan.storage_path"
+                ]
+            })
+        self.shard_view = SitemapView()
+        self.index_view = SitemapIndexView()
+
+    def generate(self, full: bool = False) -> dict[str, Any]:
+        """Regenerate sitemap files.
+
+        Args:
+            full (bool): enumerate every section and check every shard, ignoring
+                high-water marks.
+
+        Returns:
+            dict[str, Any]: names of `written`, `skipped` and `removed`
+                shards. Shards that were checked but had the same content are
+                listed as `unchanged`. `duplicates` maps section names to the
+                number of entries dropped because their URL was already listed.
+        """
+        # Entities store naive UTC timestamps
+        started_at = datetime.utcnow().replace(microsecond=0)
+        manifest = self.storage.get_manifest()
+        previous_shards = manifest.get("shards", {})
+        sections = get_sections()
+        report = {"written": [], "unchanged": [], "skipped": [], "removed": []}
+        shards = {}
+        section_info = {}
+        assignments = []
+        duplicates: Counter[str] = Counter()
+        formats = [
+            format for format in configs.sitemap_export_formats()
+            if format in exports.EXPORT_FORMATS
+        ]
+
+        # Entries are checked for duplicates in the order of sections, so
+        # the first section that lists a URL keeps it
+        with UrlDeduplicator(configs.sitemap_dedup_exact_limit()) as seen:
+            for name in utils.get_included_sections():
+                section = sections[name]
+                assignment = ShardAssignment.load(name, configs.sitemap_shard_size())
+                section_shards = {
+                    shard: info for shard, info in previous_shards.items()
+                    if info["section"] == name
+                }
+                members, stale, total = self._assign_entries(
+                    section, assignment, section_shards, full, seen, duplicates
+                )
+                # Shards without files of every format are checked as well
+                pages = sorted(set(assignment.shards.values()))
+                missing = {
+                    page for page in pages
+                    if not _has_exports(section_shards.get(f"{name}-{page}"), formats)
+                }
+                if missing - stale:
+                    stale |= missing
+                    members.update(
+                        self._get_members(section, assignment, missing - set(members))
+                    )
+                    pages = sorted(set(assignment.shards.values()))
+
+                # Shards cut by the byte budget add pages while the loop runs
+                for page in pages:
+                    shard = f"{name}-{page}"
+                    if page not in stale:
+                        # Nothing changed since the oldest watermark, so the
+                        # shard is up to date as of this run
+                        shards[shard] = dict(
+                            previous_shards[shard], watermark=started_at.isoformat()
+                        )
+                        report["skipped"].append(shard)
+                        continue
+
+                    items = members[page]
+                    urls = list(self.shard_view._iter_urls(section, items))
+                    kept = self._fit_budget(section, urls)
+                    cut = kept < len(urls)
+                    if cut:
+                        overflow = max(pages) + 1
+                        members[overflow] = items[kept:]
+                        assignment.move(members[overflow], overflow)
+                        del items[kept:], urls[kept:]
+                        stale.add(overflow)
+                        pages.append(overflow)
+
+                    content_hash = _hash_urls(urls)
+                    previous = previous_shards.get(shard)
+                    if (
+                        previous
+                        and previous.get("hash") == content_hash
+                        and os.path.exists(self.storage.file_path(shard))
+                        and _has_exports(previous, formats)
+                    ):
+                        shards[shard] = dict(
+                            previous, watermark=started_at.isoformat(), full=cut
+                        )
+                        report["unchanged"].append(shard)
+                        continue
+
+                    content = self.shard_view._render_urlset(section, urls, shard)
+                    shards[shard] = {
+                        "section": name,
+                        "page": page,
+                        "watermark": started_at.isoformat(),
+                        "modified": started_at.isoformat(),
+                        "hash": content_hash,
+                        "etag": self.storage.write(shard, content),
+                        "size": len(content),
+                        "full": cut,
+                    }
+                    if formats:
+                        shards[shard]["exports"] = self._write_exports(
+                            section, urls, shard, formats
+                        )
+                    report["written"].append(shard)
+
+                section_info[name] = {
+                    "total": total,
+                    "shards": len(pages),
+                    "duplicates": duplicates[name],
+                }
+                assignments.append(assignment)
+
+        for shard in set(previous_shards) - set(shards):
+            self.storage.remove(shard)
+            report["removed"].append(shard)
+
+        index = [
+            (info["section"], info["page"], info.get("modified", info["watermark"]))
+            for info in shards.values()
+        ]
+        content = self.index_view._generate_index_content(index)
+        index_info = manifest.get("index")
+        if (
+            not index_info
+            or index_info["etag"] != _etag(content)
+            or not os.path.exists(self.storage.file_path(INDEX))
+        ):
+            index_info = {
+                "etag": self.storage.write(INDEX, content),
+                "size": len(content),
+                "modified": started_at.isoformat(),
+            }
+
+        self.storage.save_manifest({
+            "generated_at": started_at.isoformat(),
+            "index": index_info,
+            "sections": section_info,
+            "shards": shards,
+        })
+
+        # Shards of entries are stored after the manifest, so a run interrupted
+        # before it assigns the same shards and rewrites them again
+        for assignment in assignments:
+            assignment.save()
+
+        stats.record_duplicates(dict(duplicates))
+
+        log.info(
+            "Sitemap generated: %d written, %d unchanged, %d skipped, %d removed shards",
+            len(report["written"]),
+            len(report["unchanged"]),
+            len(report["skipped"]),
+            len(report["removed"]),
+        )
+        if duplicates:
+            log.info("Duplicate URLs dropped: %s", dict(duplicates))
+        report["duplicates"] = dict(duplicates)
+        return report
+
+    def _write_exports(
+        self,
+        section: SitemapSection,
+        urls: list[SitemapUrl],
+        shard: str,
+        formats: list[str],
+    ) -> dict[str, dict[str, Any]]:
+        """Write exports of the shard in plain formats.
+
+        Args:
+            section (SitemapSection): the sitemap section.
+            urls (list[SitemapUrl]): URLs of the shard.
+            shard (str): name of the shard.
+            formats (list[str]): names of export formats.
+
+        Returns:
+            dict[str, dict[str, Any]]: ETag and size of every export.
+        """
+        result = {}
+        for format in formats:
+            content = exports.render(format, urls, section.name)
+            result[format] = {
+                "etag": self.storage.write(shard, content, format),
+                "size": len(content),
+            }
+        return result
+
+    def _drop_duplicates(
+        self,
+        section: SitemapSection,
+        entries: Iterable[SitemapEntry],
+        seen: UrlDeduplicator,
+        duplicates: Counter[str],
+    ) -> Iterator[SitemapEntry]:
+        """Skip entries whose URL was already listed.
+
+        Args:
+            section (SitemapSection): the sitemap section.
+            entries (Iterable[SitemapEntry]): entries of the section.
+            seen (UrlDeduplicator): URLs listed by previous entries.
+            duplicates (Counter[str]): number of skipped entries per section,
+                updated in place.
+
+        Yields:
+            SitemapEntry: entries with a URL seen for the first time.
+        """
+        for entry in entries:
+            if seen.add(self.shard_view._get_entity_url(entry)):
+                yield entry
+            else:
+                duplicates[section.name] += 1
+
+    def _fit_budget(self, section: SitemapSection, urls: list[SitemapUrl]) -> int:
+        """Count URLs that fit into a shard of `ckanext.sitemap.shard_max_bytes`.
+
+        A shard always keeps its first URL, even if it's over the budget alone.
+
+        Args:
+            section (SitemapSection): the sitemap section.
+            urls (list[SitemapUrl]): URLs of the shard.
+
+        Returns:
+            int: number of leading URLs that fit into the budget.
+        """
+        budget = configs.sitemap_shard_max_bytes()
+        size = measure_urlset(self.shard_view._get_comment(section))
+        for kept, url in enumerate(urls):
+            size += measure_url(url)
+            if size > budget:
+                return max(kept, 1)
+        return len(urls)
+
+    def _assign_entries(
+        self,
+        section: SitemapSection,
+        assignment: ShardAssignment,
+        section_shards: dict[str, dict[str, Any]],
+        full: bool,
+        seen: UrlDeduplicator,
+        duplicates: Counter[str],
+    ) -> tuple[dict[int, list[SitemapEntry]], set[int], int]:
+        """Assign shards to the section entries and find stale shards.
+
+        A shard is stale when its entries were added, removed or modified
+        after the high-water mark of the oldest shard of the section. When the
+        section reports modified entries and looks entries up by name, only
+        these entries and the members of stale shards are read. Otherwise, eg.
+        on a full run, every entry of the section is read and compared with the
+        stored assignment.
+
+        Args:
+            section (SitemapSection): the sitemap section.
+            assignment (ShardAssignment): stored shards of the section entries.
+            section_shards (dict[str, dict[str, Any]]): shards of the section
+                from the manifest.
+            full (bool): check every shard, ignoring high-water marks.
+            seen (UrlDeduplicator): URLs listed by previous entries.
+            duplicates (Counter[str]): number of skipped entries per section.
+
+        Returns:
+            tuple[dict[int, list[SitemapEntry]], set[int], int]: entries
+                grouped by their shard, covering at least the stale shards,
+                numbers of stale shards and the number of section entries.
+        """
+        limit = utils.get_section_limit(section.name)
+        closed = {info["page"] for info in section_shards.values() if info.get("full")}
+        watermarks = [
+            datetime.fromisoformat(info["watermark"]) for info in section_shards.values()
+        ]
+        changed = None
+        if not full and watermarks:
+            changed = section.changed_since(min(watermarks))
+        found = None if changed is None else section.get_entries(changed)
+
+        if found is None:
+            entries = _CountingIterator(section.iter_entries())
+            unique = self._drop_duplicates(section, entries, seen, duplicates)
+            members, stale = assignment.update(unique, limit, closed)
+            if changed is None:
+                stale = set(members)
+            else:
+                stale |= {
+                    assignment.shards[name] for name in changed
+                    if name in assignment.shards
+                }
+            return members, stale, entries.count
+
+        found_names = {entry.name for entry in found}
+        stale = {
+            assignment.shards[name] for name in found_names if name in assignment.shards
+        }
+        stale |= assignment.remove(name for name in changed if name not in found_names)
+        new = sorted(
+            (entry for entry in found if entry.name not in assignment.shards),
+            key=lambda entry: entry.name,
+        )
+        unique = self._drop_duplicates(section, new, seen, duplicates)
+        stale |= assignment.add([entry.name for entry in unique], limit, closed)
+
+        members = self._get_members(section, assignment, stale)
+        return members, stale, len(assignment.shards)
+
+    def _get_members(
+        self,
+        section: SitemapSection,
+        assignment: ShardAssignment,
+        shards: set[int],
+    ) -> dict[int, list[SitemapEntry]]:
+        """Read entries of the given shards from the section.
+
+        Entries that are no longer in the section are removed from the
+        assignment.
+
+        Args:
+            section (SitemapSection): a section that looks entries up by name.
+            assignment (ShardAssignment): stored shards of the section entries.
+            shards (set[int]): numbers of shards.
+
+        Returns:
+            dict[int, list[SitemapEntry]]: entries grouped by their shard.
+        """
+        names = assignment.get_members(shards)
+        found = {
+            entry.name: entry
+            for entry in section.get_entries([
+                name for items in names.values() for name in items
+            ]) or []
+        }
+        assignment.remove(
+            name for items in names.values() for name in items if name not in found
+        )
+        members = {
+            shard: [found[name] for name in items if name in found]
+            for shard, items in names.items()
+        }
+        return {shard: items for shard, items in members.items() if items}
+
+
+def _has_exports(info: dict[str, Any] | None, formats: list[str]) -> bool:
+    """Check if the shard from the manifest has exports in every format."""
+    return info is not None and all(format in info.get("exports", {}) for format in formats)
+
+
+def _etag(content: bytes) -> str:
+    return hashlib.sha1(content).hexdigest()
+
+
+def _hash_urls(urls: Iterable[SitemapUrl]) -> str:
+    """Compute a hash of the shard content from values of its `<url>` elements.
+
+    The hash is independent of the renderer, so switching
+    `ckanext.sitemap.renderer` does not rewrite the shards.
+
+    Args:
+        urls (Iterable[SitemapUrl]): values of `<url>` elements of the shard.
+
+    Returns:
+        str: hex digest of the values.
+    """
+    digest = hashlib.sha1()
+    for url in urls:
+        fields = [url.loc, url.lastmod or "", str(url.changefreq), str(url.priority)]
+        fields.extend(f"{lang}={href}" for lang, href in url.alternates)
+        digest.update("\t".join(fields).encode("utf-8"))
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+
+class _CountingIterator:
+    """Iterator that counts produced items."""
+
+    def __init__(self, items: Iterable[Any]):
+        self._items = iter(items)
+        self.count = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        item = next(self._items)
+        self.count += 1
+        return item
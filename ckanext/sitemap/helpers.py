@@ -4,6 +4,7 @@ from ckan.common import _
 from ckan.plugins import toolkit as tk
 
 from ckanext.sitemap import configs, utils
+from ckanext.sitemap.sections import get_sections
 
 
 def get_available_languages():
@@ -44,7 +45,7 @@ def as_bool(value):
 def get_sitemap_settings(key: str) -> Any:
     """Get sitemap core settings from configs module."""
     settings = {
-        "sitemap_sections": configs.SITEMAP_SECTIONS,
+        "sitemap_sections": list(get_sections()),
         "sitemap_default_limit": configs.sitemap_default_limit(),
         "sitemap_default_priority": configs.sitemap_default_priority(),
         "sitemap_default_changefreq": configs.sitemap_default_changefreq(),
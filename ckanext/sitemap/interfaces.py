@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from ckan.plugins.interfaces import Interface
+
+if TYPE_CHECKING:
+    from ckanext.sitemap.sections import SitemapSection
+
+
+class ISitemap(Interface):
+    """Register additional sitemap sections.
+
+    Example:
+        >>> from ckanext.sitemap.sections import SitemapSection
+        >>>
+        >>> class ShowcaseSection(SitemapSection):
+        ...     def iter_entries(self, offset=0, limit=None):
+        ...         ...
+        ...     def count(self):
+        ...         ...
+        >>>
+        >>> class ShowcasePlugin(p.SingletonPlugin):
+        ...     p.implements(ISitemap, inherit=True)
+        ...
+        ...     def get_sitemap_sections(self):
+        ...         return [ShowcaseSection("showcases")]
+    """
+
+    def get_sitemap_sections(self) -> list[SitemapSection]:
+        """Return sections that should be added to the sitemap.
+
+        Every section is rendered, split into shards and configured through
+        the admin interface in the same way as the built-in ones.
+
+        Returns:
+            list[SitemapSection]: additional sitemap sections.
+        """
+        return []
@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+from typing import Any
+
+from ckan import types
+from ckan.plugins import toolkit as tk
+
+from ckanext.sitemap import stats, utils
+from ckanext.sitemap.sections import get_sections
+
+
+@tk.side_effect_free
+def sitemap_stats(context: types.Context, data_dict: types.DataDict) -> dict[str, Any]:
+    """Report the size of every sitemap section without rendering the sitemap.
+
+    For each section the result contains the total number of entities, the number
+    of entities included under the current `<section>_limit`, the number of
+    sitemap files required to hold them and details of the latest generation.
+    The `over_limit` flag can be used for alerting when a section outgrows its limit.
+
+    Requests of crawlers to sitemap files are reported under the `crawlers` key.
+    Counters are flushed by every worker periodically, so the most recent
+    requests may be missing.
+
+    Returns:
+        dict[str, Any]: dictionary with `sections` key that maps section name
+            to its statistics and `crawlers` key that maps crawler name to
+            requests, `304 Not Modified` responses, sent bytes and average
+            duration per sitemap file.
+    """
+    tk.check_access("sitemap_stats", context, data_dict)
+
+    included_sections = utils.get_included_sections()
+    generation = stats.get_generation_info()
+    duplicates = stats.get_duplicates()
+    sections = {}
+
+    for name, section in get_sections().items():
+        total = section.count()
+        limit = utils.get_section_limit(name)
+        shards = utils.get_shard_count(name, total)
+
+        # Every shard is generated separately, so the section was last
+        # generated when its latest shard was
+        shard_generations = [
+            generation[shard] for shard in utils.get_shard_names(name, shards)
+            if shard in generation
+        ]
+
+        sections[name] = {
+            "excluded": name not in included_sections,
+            "total": total,
+            "limit": limit,
+            "included": min(total, limit),
+            "over_limit": total > limit,
+            "shards": shards,
+            "generated_at": max(
+                (info["generated_at"] for info in shard_generations), default=None
+            ),
+            "duration": sum(info["duration"] for info in shard_generations)
+            if shard_generations else None,
+            "duplicates": duplicates.get(name),
+        }
+
+    return {"sections": sections, "crawlers": stats.get_crawler_stats()}
+
+
+def sitemap_profile(context: types.Context, data_dict: types.DataDict) -> dict[str, Any]:
+    """Render sitemap files under the profiler.
+
+    Profiles are stored in the `profiles` folder of the sitemap storage, see
+    `ckanext.sitemap.profiling`. Must be called within a request context, as
+    sitemap URLs are built by the router.
+
+    Args:
+        section (str, optional): name of the section to profile. Every
+            included section is profiled by default.
+        page (int, optional): number of the profiled shard. Defaults to 1.
+
+    Returns:
+        dict[str, Any]: dictionary with `profiles` key that maps the name of
+            every profiled sitemap file to the summary of its profile.
+    """
+    from ckanext.sitemap import profiling
+    from ckanext.sitemap.views.sitemap import SitemapView
+
+    tk.check_access("sitemap_profile", context, data_dict)
+
+    if not profiling.get_profiles_path():
+        raise tk.ValidationError({
+            "storage_path": ["Set ckanext.sitemap.storage_path or ckan.storage_path"]
+        })
+
+    included = utils.get_included_sections()
+    names = [data_dict["section"]] if data_dict.get("section") else included
+    page = tk.asint(data_dict.get("page", 1))
+    sections = get_sections()
+    view = SitemapView()
+    profiles = {}
+
+    for name in names:
+        if name not in included:
+            raise tk.ValidationError({"section": [f"Section is not included: {name}"]})
+
+        section = sections[name]
+        if not 1 <= page <= max(1, utils.get_shard_count(name, section.count())):
+            raise tk.ValidationError({"page": [f"Section {name} has no shard {page}"]})
+
+        def render():
+            return view._generate_sitemap_content(section, page, section.count())
+
+        profiles[f"{name}-{page}"] = profiling.profile_render(f"{name}-{page}", render)
+
+    return {"profiles": profiles}
@@ -0,0 +1,13 @@
+from __future__ import annotations
+
+from ckan import types
+
+
+def sitemap_stats(context: types.Context, data_dict: types.DataDict) -> types.AuthResult:
+    """Only sysadmins can see sitemap statistics."""
+    return {"success": False}
+
+
+def sitemap_profile(context: types.Context, data_dict: types.DataDict) -> types.AuthResult:
+    """Only sysadmins can profile sitemap rendering."""
+    return {"success": False}
@@ -0,0 +1,29 @@
+"""Create sitemap_shard_entry table
+
+Revision ID: 4f1c2d9b7e3a
+Revises:
+Create Date: 2026-10-19 08:12:40.316572
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "4f1c2d9b7e3a"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "sitemap_shard_entry",
+        sa.Column("section", sa.Text, primary_key=True),
+        sa.Column("name", sa.Text, primary_key=True),
+        sa.Column("shard", sa.Integer, nullable=False),
+    )
+
+
+def downgrade():
+    op.drop_table("sitemap_shard_entry")
@@ -0,0 +1,28 @@
+"""Database tables of sitemap plugin.
+
+Tables are created by the plugin migrations:
+
+    ckan db upgrade -p sitemap
+"""
+
+from __future__ import annotations
+
+from sqlalchemy import Column, Integer, Text
+
+from ckan.plugins import toolkit as tk
+
+
+class SitemapShardEntry(tk.BaseModel):
+    """Assignment of a sitemap entry to a shard of its section.
+
+    Attributes:
+        section (str): name of the sitemap section.
+        name (str): name of the entry.
+        shard (int): number of the shard, starting from 1.
+    """
+
+    __tablename__ = "sitemap_shard_entry"
+
+    section = Column(Text, primary_key=True)
+    name = Column(Text, primary_key=True)
+    shard = Column(Integer, nullable=False)
@@ -1,18 +1,24 @@
+import logging
+
 import ckan.plugins as p
 import ckan.plugins.toolkit as tk
 
 from ckan import types
 from ckan.common import CKANConfig
 
-from ckanext.sitemap.middlewares import add_noindex_nofollow
-from ckanext.sitemap.configs import sitemap_enable_indexing_block
+
+log = logging.getLogger(__name__)
 
 
+@tk.blanket.actions
+@tk.blanket.auth_functions
 @tk.blanket.blueprints
+@tk.blanket.cli
 @tk.blanket.helpers
 @tk.blanket.validators
 class SitemapPlugin(p.SingletonPlugin):
     p.implements(p.IConfigurer)
+    p.implements(p.IConfigurable)
     p.implements(p.IDomainObjectModification, inherit=True)
     p.implements(p.IMiddleware, inherit=True)
 
@@ -22,8 +28,27 @@ class SitemapPlugin(p.SingletonPlugin):
         tk.add_public_directory(config_, "public")
         tk.add_resource("assets", "sitemap")
 
+    # IConfigurable
+    def configure(self, config_: CKANConfig):
+        from ckanext.sitemap.prewarm import enqueue_prewarm
+
+        try:
+            enqueue_prewarm()
+        except Exception:
+            # A missing Redis must not prevent CKAN from starting
+            log.exception("Cannot enqueue sitemap prewarming")
+
     # IMiddleware
     def make_middleware(self, app: types.CKANApp, config: CKANConfig) -> types.CKANApp:
+        from ckanext.sitemap.configs import sitemap_enable_indexing_block
+        from ckanext.sitemap.middlewares import add_noindex_nofollow
+
         if sitemap_enable_indexing_block():
             app.after_request(add_noindex_nofollow)
         return app
+
+    # IDomainObjectModification
+    def notify(self, entity, operation):
+        from ckanext.sitemap.recent import notify
+
+        notify(entity, operation)
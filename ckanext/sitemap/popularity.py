@@ -0,0 +1,187 @@
+"""Priority of datasets computed from their popularity.
+
+With `ckanext.sitemap.priority_source` set to "views" or "downloads", the
+priority of a dataset is derived from CKAN tracking data (the
+`tracking_summary` table filled by `ckan tracking update`) instead of the
+static `datasets_priority` setting:
+
+- "views": visits of the dataset page
+- "downloads": downloads of the dataset resources
+
+Counts are scaled logarithmically against the most popular dataset, so the
+priority stays within the 0.0-1.0 range of the sitemap protocol and a few very
+popular datasets don't push every other one to zero. Counts are read with one
+aggregate query per batch of entries and cached for
+`ckanext.sitemap.priority_cache_ttl` seconds, so the cost per URL is a
+dictionary lookup.
+
+If tracking data can't be read, eg. CKAN 2.11 runs without ckanext-tracking
+and the `tracking_summary` table doesn't exist, the error is logged and the
+static priority is used until the cache expires.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import threading
+import time
+
+from typing import Any, Callable, TypeVar
+
+from ckanext.sitemap import configs
+
+
+log = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Priorities are rounded to one decimal, every URL refers to one of these
+PRIORITIES = tuple(f"{step / 10:.1f}" for step in range(11))
+
+
+class PriorityCache:
+    """Priorities of datasets computed from a single popularity source.
+
+    Attributes:
+        source (str): "views" or "downloads".
+        expires_at (float): moment when the cached values become stale.
+        available (bool): False if tracking data can't be read.
+        highest (int): popularity of the most popular dataset.
+        priorities (dict[str, str]): mapping of dataset name to its priority.
+    """
+
+    def __init__(self, source: str, ttl: int):
+        self.source = source
+        self.expires_at = time.monotonic() + ttl
+        self.available = True
+        self.highest = self._query(_get_highest_count, source) or 0
+        self.priorities: dict[str, str] = {}
+
+    def get(self, names: list[str]) -> dict[str, str] | None:
+        """Get priorities of a batch of datasets.
+
+        Args:
+            names (list[str]): names of datasets.
+
+        Returns:
+            dict[str, str] | None: mapping of dataset name to its priority, or
+                None if tracking data can't be read.
+        """
+        if not self.available:
+            return None
+
+        missing = [name for name in names if name not in self.priorities]
+        if missing:
+            counts = self._query(_get_counts, self.source, missing)
+            if counts is None:
+                return None
+            for name in missing:
+                self.priorities[name] = self._scale(counts.get(name, 0))
+
+        return {name: self.priorities[name] for name in names}
+
+    def _scale(self, count: int) -> str:
+        if count <= 0 or self.highest <= 0:
+            return PRIORITIES[0]
+        value = math.log1p(count) / math.log1p(self.highest)
+        return PRIORITIES[round(min(1.0, value) * 10)]
+
+    def _query(self, query: Callable[..., T], *args: Any) -> T | None:
+        """Run the query, disabling the cache if tracking data can't be read."""
+        from sqlalchemy.exc import SQLAlchemyError
+
+        from ckan import model
+
+        try:
+            return query(*args)
+        except SQLAlchemyError:
+            log.warning(
+                "Cannot read %s from tracking data, the static priority is used",
+                self.source,
+                exc_info=True,
+            )
+            # The failed statement aborts the transaction of the session
+            model.Session.rollback()
+            self.available = False
+            return None
+
+
+_cache: PriorityCache | None = None
+_lock = threading.Lock()
+
+
+def get_dataset_priorities(names: list[str]) -> dict[str, str] | None:
+    """Get priorities of a batch of datasets from their popularity.
+
+    Args:
+        names (list[str]): names of datasets.
+
+    Returns:
+        dict[str, str] | None: mapping of dataset name to its priority, or
+            None if the static priority is used.
+    """
+    global _cache
+
+    source = configs.sitemap_priority_source()
+    if source == "static":
+        return None
+
+    with _lock:
+        if _cache is None or _cache.source != source or (
+            _cache.expires_at < time.monotonic()
+        ):
+            _cache = PriorityCache(source, configs.sitemap_priority_cache_ttl())
+        return _cache.get(names)
+
+
+def _get_counts(source: str, names: list[str]) -> dict[str, int]:
+    """Count views or downloads of a batch of datasets with a single query."""
+    from ckan import model
+
+    query = _popularity_query(source).filter(model.Package.name.in_(names))
+    return {name: int(count) for name, count in query}
+
+
+def _get_highest_count(source: str) -> int:
+    from sqlalchemy import func
+
+    from ckan import model
+
+    counts = _popularity_query(source).subquery()
+    highest = model.Session.query(func.max(counts.c.count)).scalar()
+    return int(highest or 0)
+
+
+def _popularity_query(source: str) -> Any:
+    """Build a query of dataset names and their total views or downloads."""
+    from sqlalchemy import column, func, table
+
+    from ckan import model
+
+    # The table is declared here, as its model moved to ckanext-tracking in
+    # recent CKAN versions
+    summary = table(
+        "tracking_summary",
+        column("url"),
+        column("package_id"),
+        column("tracking_type"),
+        column("count"),
+    )
+    total = func.sum(summary.c.count).label("count")
+
+    query = model.Session.query(model.Package.name.label("name"), total)
+    if source == "downloads":
+        query = (
+            query.join(model.Resource, model.Resource.package_id == model.Package.id)
+            .join(summary, summary.c.url == model.Resource.url)
+            .filter(summary.c.tracking_type == "resource")
+            .filter(model.Resource.state == "active")
+        )
+    else:
+        query = (
+            query.join(summary, summary.c.package_id == model.Package.id)
+            .filter(summary.c.tracking_type == "page")
+        )
+
+    return query.filter(model.Package.state == "active").group_by(model.Package.name)
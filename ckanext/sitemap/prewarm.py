@@ -0,0 +1,155 @@
+"""Background generation of sitemap files before crawlers ask for them.
+
+When `ckanext.sitemap.prewarm` is enabled, the plugin enqueues a background
+job that runs the sitemap generator:
+- when CKAN starts, so shards changed while the portal was down are rewritten
+- when sitemap settings are saved or reset on the admin page, so every shard
+  is checked against the new settings
+- when a sitemap request finds generated files older than
+  `ckanext.sitemap.prewarm_interval`, so new and modified datasets are listed
+
+Every CKAN worker starts the plugin, so a marker in Redis keeps a single job
+of every kind in the queue. The marker is removed when the job starts, and a
+change made during the generation enqueues the next one.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Iterator
+
+from ckan.plugins import toolkit as tk
+
+from ckanext.sitemap import configs
+
+
+log = logging.getLogger(__name__)
+
+PREWARM_KEY = "ckanext:sitemap:prewarm:{}"
+
+# The marker expires if the queued job is lost
+PREWARM_TTL = 3600
+
+# Seconds between attempts of a worker to enqueue the refresh of stale files
+REFRESH_CHECK_INTERVAL = 60
+
+_refresh_checked_at: float | None = None
+
+
+def enqueue_prewarm(full: bool = False) -> bool:
+    """Enqueue the background generation of sitemap files.
+
+    Args:
+        full (bool): check every shard, not only those with modified entities.
+
+    Returns:
+        bool: True if the job was enqueued, False if prewarming is disabled or
+            the same job is already in the queue.
+    """
+    if not configs.sitemap_prewarm():
+        return False
+
+    if not configs.sitemap_storage_path():
+        log.warning(
+            "Sitemap prewarming requires ckanext.sitemap.storage_path or ckan.storage_path"
+        )
+        return False
+
+    from ckan.lib.redis import connect_to_redis
+
+    redis = connect_to_redis()
+    key = _get_key(full)
+    if not redis.set(key, 1, nx=True, ex=PREWARM_TTL):
+        return False
+
+    try:
+        tk.enqueue_job(
+            prewarm,
+            kwargs={"full": full},
+            title="Generate sitemap files",
+            rq_kwargs={"timeout": configs.sitemap_prewarm_timeout()},
+        )
+    except Exception:
+        redis.delete(key)
+        raise
+
+    return True
+
+
+def refresh_if_stale(generated_at: str):
+    """Enqueue the incremental generation if generated files are outdated.
+
+    Called by sitemap views that serve generated files. Every worker tries to
+    enqueue the job at most once per `REFRESH_CHECK_INTERVAL` seconds, and the
+    marker of `enqueue_prewarm` keeps a single job in the queue.
+
+    Args:
+        generated_at (str): ISO-formatted moment of the latest generation.
+    """
+    global _refresh_checked_at
+
+    interval = configs.sitemap_prewarm_interval()
+    if not interval or not configs.sitemap_prewarm():
+        return
+
+    # Entities store naive UTC timestamps
+    age = datetime.utcnow() - datetime.fromisoformat(generated_at)
+    if age < timedelta(seconds=interval):
+        return
+
+    now = time.monotonic()
+    if _refresh_checked_at is not None and now - _refresh_checked_at < REFRESH_CHECK_INTERVAL:
+        return
+    _refresh_checked_at = now
+
+    try:
+        enqueue_prewarm()
+    except Exception:
+        # Outdated files are still better than a failed sitemap request
+        log.exception("Cannot enqueue sitemap refresh")
+
+
+def prewarm(full: bool = False):
+    """Generate sitemap files. Executed by a background worker.
+
+    Args:
+        full (bool): check every shard, not only those with modified entities.
+    """
+    from ckan.lib.redis import connect_to_redis
+
+    from ckanext.sitemap.generator import SitemapGenerator
+
+    connect_to_redis().delete(_get_key(full))
+
+    with _request_context():
+        report = SitemapGenerator().generate(full=full)
+
+    log.info("Sitemap prewarmed: %d shards written", len(report["written"]))
+
+
+@contextmanager
+def _request_context() -> Iterator[None]:
+    """Provide the request context required by the router to build URLs."""
+    import flask
+
+    if flask.has_request_context():
+        yield
+        return
+
+    if flask.has_app_context():
+        app = flask.current_app
+    else:
+        from ckan.config.middleware import make_app
+
+        app = make_app(tk.config)._wsgi_app
+
+    with app.test_request_context():
+        yield
+
+
+def _get_key(full: bool) -> str:
+    return PREWARM_KEY.format("full" if full else "incremental")
@@ -0,0 +1,193 @@
+"""Profiling of sitemap rendering.
+
+A render is profiled on demand only: sysadmins trigger it with the
+`sitemap_profile` action (the "Profile rendering" button of the admin page).
+pyinstrument is used when it is installed, cProfile otherwise. For every
+profiled sitemap file the `profiles` folder inside the sitemap storage keeps
+a `.prof` file readable by `pstats`/snakeviz and a JSON summary with the top
+call stacks and the number of database queries and Solr requests.
+"""
+
+from __future__ import annotations
+
+import io
+import json
+import os
+import threading
+import time
+
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Callable, Iterator
+
+from ckanext.sitemap import configs
+
+
+PROFILES_FOLDER = "profiles"
+
+# Number of functions listed in the cProfile summary
+TOP_FUNCTIONS = 30
+
+# Counters of open `count_calls` blocks. Hooks are installed while the list is
+# not empty and removed by the last block, so overlapping blocks don't restore
+# each other's hooks.
+_counting_lock = threading.Lock()
+_active_counters: list[dict[str, int]] = []
+_send_request: Callable[..., Any] | None = None
+
+
+def get_profiles_path() -> str | None:
+    """Get the folder with stored profiles."""
+    path = configs.sitemap_storage_path()
+    return os.path.join(path, PROFILES_FOLDER) if path else None
+
+
+def profile_render(name: str, render: Callable[[], bytes]) -> dict[str, Any]:
+    """Render a sitemap file under the profiler and store the results.
+
+    Args:
+        name (str): name of the sitemap file, eg. `datasets-1`.
+        render (Callable[[], bytes]): renders the complete XML document.
+
+    Returns:
+        dict[str, Any]: summary of the profile.
+    """
+    path = get_profiles_path()
+    os.makedirs(path, exist_ok=True)
+    profiled_at = datetime.utcnow()
+
+    with count_calls() as calls:
+        started = time.perf_counter()
+        engine, top, stats = _run_profiler(render)
+        duration = time.perf_counter() - started
+
+    with open(os.path.join(path, f"{name}.prof"), "wb") as dest:
+        dest.write(stats)
+
+    summary = {
+        "name": name,
+        "engine": engine,
+        "profiled_at": profiled_at.isoformat(),
+        "duration": round(duration, 6),
+        "db_queries": calls["db_queries"],
+        "solr_calls": calls["solr_calls"],
+        "top": top,
+    }
+    with open(os.path.join(path, f"{name}.json"), "w") as dest:
+        json.dump(summary, dest, indent=2)
+
+    return summary
+
+
+def get_profiles() -> list[dict[str, Any]]:
+    """Get summaries of stored profiles, ordered by file name."""
+    path = get_profiles_path()
+    if not path or not os.path.isdir(path):
+        return []
+
+    profiles = []
+    for filename in sorted(os.listdir(path)):
+        if filename.endswith(".json"):
+            with open(os.path.join(path, filename)) as source:
+                profiles.append(json.load(source))
+    return profiles
+
+
+def _run_profiler(render: Callable[[], bytes]) -> tuple[str, str, bytes]:
+    """Run the render under the available profiler.
+
+    Returns:
+        tuple[str, str, bytes]: name of the profiler, text of the top call
+            stacks and the content of the `.prof` file.
+    """
+    try:
+        from pyinstrument import Profiler
+        from pyinstrument.renderers import PstatsRenderer
+    except ImportError:
+        return _run_cprofile(render)
+
+    profiler = Profiler()
+    profiler.start()
+    try:
+        render()
+    finally:
+        profiler.stop()
+
+    stats = profiler.output(PstatsRenderer())
+    return (
+        "pyinstrument",
+        profiler.output_text(),
+        stats.encode("utf-8", "surrogateescape"),
+    )
+
+
+def _run_cprofile(render: Callable[[], bytes]) -> tuple[str, str, bytes]:
+    import cProfile
+    import marshal
+    import pstats
+
+    profiler = cProfile.Profile()
+    profiler.runcall(render)
+
+    stream = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stream)
+    stats.sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+
+    profiler.create_stats()
+    return "cProfile", stream.getvalue(), marshal.dumps(profiler.stats)
+
+
+@contextmanager
+def count_calls() -> Iterator[dict[str, int]]:
+    """Count database queries and Solr requests made within the block.
+
+    Requests served by other threads of the worker at the same time are
+    counted as well. Blocks may overlap, eg. when profiles are requested
+    concurrently.
+    """
+    from sqlalchemy import event
+
+    from ckan import model
+
+    global _send_request
+
+    try:
+        import pysolr
+    except ImportError:
+        pysolr = None
+
+    calls = {"db_queries": 0, "solr_calls": 0}
+    with _counting_lock:
+        if not _active_counters:
+            event.listen(model.meta.engine, "before_cursor_execute", _count_query)
+            if pysolr:
+                _send_request = pysolr.Solr._send_request
+                pysolr.Solr._send_request = _count_solr_request
+        _active_counters.append(calls)
+
+    try:
+        yield calls
+    finally:
+        with _counting_lock:
+            _active_counters[:] = [
+                counters for counters in _active_counters if counters is not calls
+            ]
+            if not _active_counters:
+                event.remove(model.meta.engine, "before_cursor_execute", _count_query)
+                if pysolr:
+                    pysolr.Solr._send_request = _send_request
+
+
+def _count(key: str):
+    with _counting_lock:
+        for counters in _active_counters:
+            counters[key] += 1
+
+
+def _count_query(*args: Any, **kwargs: Any):
+    _count("db_queries")
+
+
+def _count_solr_request(self: Any, *args: Any, **kwargs: Any) -> Any:
+    _count("solr_calls")
+    return _send_request(self, *args, **kwargs)
@@ -0,0 +1,189 @@
+"""In-memory sitemap of recently changed datasets.
+
+Every worker keeps a ring buffer of datasets modified within the last
+`ckanext.sitemap.recent_hours` hours. The buffer is fed by dataset
+modification notifications and seeded with a single query sorted by
+`metadata_modified` to the source of `ckanext.sitemap.datasets_source`, so
+datasets are listed at the same URLs as in dataset shards. As notifications reach only the worker that made the
+change, the buffer is re-seeded every `ckanext.sitemap.recent_refresh` seconds.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Callable, Iterator
+
+from ckanext.sitemap import configs, popularity, translations
+from ckanext.sitemap.entries import SitemapEntry
+from ckanext.sitemap.sections import SitemapSection, get_datasets_section
+
+
+SECTION = "recent"
+
+
+class RecentChanges:
+    """Ring buffer of recently modified datasets.
+
+    Entries are ordered by the time they were added, the most recent last.
+    Every change of the buffer increments `version`, which is used to decide
+    whether the rendered sitemap must be rebuilt.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: deque[SitemapEntry] = deque(maxlen=configs.sitemap_recent_size())
+        self._seeded_at: float | None = None
+        self._rendered: tuple[int, bytes, str] | None = None
+        self.version = 0
+
+    def add(self, entry: SitemapEntry):
+        """Add or move the dataset to the end of the buffer."""
+        with self._lock:
+            self._discard(entry.name)
+            self._entries.append(entry)
+            self.version += 1
+
+    def remove(self, name: str):
+        """Remove the dataset from the buffer, eg. when it was deleted."""
+        with self._lock:
+            if self._discard(name):
+                self.version += 1
+
+    def get_entries(self) -> list[SitemapEntry]:
+        """Get datasets modified within the configured time window.
+
+        The buffer is seeded on the first call and re-seeded when the refresh
+        interval has passed. Expired entries are dropped.
+
+        Returns:
+            list[SitemapEntry]: datasets, the most recently modified first.
+        """
+        if self._needs_seed():
+            self.seed()
+
+        cutoff = _cutoff().isoformat()
+        with self._lock:
+            expired = 0
+            # entries are only ever appended, so expired ones are at the start
+            while self._entries and (self._entries[0].lastmod or "") < cutoff:
+                self._entries.popleft()
+                expired += 1
+            if expired:
+                self.version += 1
+            return list(reversed(self._entries))
+
+    def seed(self):
+        """Fill the buffer with a single query sorted by modification time."""
+        recent = get_datasets_section().get_recent(
+            _cutoff(), configs.sitemap_recent_size()
+        )
+        entries = list(reversed(recent))
+
+        with self._lock:
+            if list(self._entries) != entries:
+                self._entries.clear()
+                self._entries.extend(entries)
+                self.version += 1
+            self._seeded_at = time.monotonic()
+
+    def get_rendered(
+        self, render: Callable[[list[SitemapEntry]], bytes]
+    ) -> tuple[bytes, str]:
+        """Get the rendered sitemap, rendering it only if the buffer changed.
+
+        Args:
+            render (Callable): renders entries into a complete XML document.
+
+        Returns:
+            tuple[bytes, str]: the XML document and its ETag.
+        """
+        entries = self.get_entries()
+        version = self.version
+        rendered = self._rendered
+        if rendered and rendered[0] == version:
+            return rendered[1], rendered[2]
+
+        content = render(entries)
+        etag = hashlib.sha1(content).hexdigest()
+        self._rendered = (version, content, etag)
+        return content, etag
+
+    def _needs_seed(self) -> bool:
+        if self._seeded_at is None:
+            return True
+        return time.monotonic() - self._seeded_at > configs.sitemap_recent_refresh()
+
+    def _discard(self, name: str) -> bool:
+        for entry in self._entries:
+            if entry.name == name:
+                self._entries.remove(entry)
+                return True
+        return False
+
+
+class RecentSection(SitemapSection):
+    """Sitemap section over the buffer of recently changed datasets."""
+
+    def __init__(self, entries: list[SitemapEntry]):
+        super().__init__(SECTION)
+        self.entries = entries
+
+    def iter_entries(self, offset: int = 0, limit: int | None = None) -> Iterator[SitemapEntry]:
+        end = None if limit is None else offset + limit
+        return iter(self.entries[offset:end])
+
+    def count(self) -> int:
+        return len(self.entries)
+
+    def get_translations(self, entries: list[SitemapEntry]) -> dict[str, set[str]] | None:
+        return translations.get_dataset_translations([entry.name for entry in entries])
+
+    def get_priorities(self, entries: list[SitemapEntry]) -> dict[str, str] | None:
+        return popularity.get_dataset_priorities([entry.name for entry in entries])
+
+
+_recent_changes: RecentChanges | None = None
+
+
+def get_recent_changes() -> RecentChanges:
+    """Get the buffer of recently changed datasets of the current worker."""
+    global _recent_changes
+    if _recent_changes is None:
+        _recent_changes = RecentChanges()
+    return _recent_changes
+
+
+def notify(entity: Any, operation: str):
+    """Update the buffer after a dataset modification.
+
+    Args:
+        entity (Any): the modified domain object.
+        operation (str): type of the modification (new, changed, deleted).
+    """
+    from ckan import model
+
+    if not configs.sitemap_recent_hours() or not isinstance(entity, model.Package):
+        return
+
+    recent = get_recent_changes()
+    if entity.state != "active" or entity.private or operation == "deleted":
+        recent.remove(entity.name)
+        return
+
+    modified = entity.metadata_modified or datetime.utcnow()
+    recent.add(SitemapEntry(
+        entity.name,
+        entity.type,
+        entity.extras.get("original_path") or None,
+        modified.isoformat(),
+    ))
+
+
+def _cutoff() -> datetime:
+    # Entities store naive UTC timestamps
+    return datetime.utcnow() - timedelta(hours=configs.sitemap_recent_hours())
@@ -0,0 +1,223 @@
+"""Serializers of sitemap `urlset` documents.
+
+Two rendering engines produce identical documents:
+- "lxml" builds an element tree and serializes it with `etree.tostring`
+- "bytes" concatenates precomputed byte fragments and escapes only the
+  variable parts of every `<url>` block, which avoids allocating an element
+  per tag
+
+The engine is selected with the `ckanext.sitemap.renderer` config option.
+"""
+
+from __future__ import annotations
+
+from typing import Iterable, NamedTuple
+
+
+XML_HEADER = b'<?xml version="1.0" encoding="UTF-8"?>\n'
+
+
+class SitemapUrl(NamedTuple):
+    """Prepared values of a single `<url>` element.
+
+    Attributes:
+        loc (str): absolute URL of the page.
+        lastmod (str | None): formatted date of the last modification, or
+            None if the entity has no modification date.
+        changefreq (str): change frequency of the page.
+        priority (str): priority of the page.
+        alternates (tuple[tuple[str, str], ...]): hreflang and href of
+            alternate language versions.
+    """
+
+    loc: str
+    lastmod: str | None
+    changefreq: str
+    priority: str
+    alternates: tuple[tuple[str, str], ...] = ()
+
+
+class LxmlRenderer:
+    """Render sitemaps by building an lxml element tree."""
+
+    def render_urlset(self, urls: Iterable[SitemapUrl], comment: str | None = None) -> bytes:
+        """Render a complete `urlset` document.
+
+        Args:
+            urls (Iterable[SitemapUrl]): URLs of the sitemap.
+            comment (str, optional): comment placed before the first URL.
+
+        Returns:
+            bytes: the XML document with the XML declaration.
+        """
+        from lxml import etree
+
+        from ckanext.sitemap.configs import SITEMAP_NS, XHTML_NS
+
+        nsmap = {None: SITEMAP_NS, "xhtml": XHTML_NS}
+        link_tag = f"{{{XHTML_NS}}}link"
+
+        root = etree.Element("urlset", attrib={}, nsmap=nsmap)
+        if comment:
+            root.append(etree.Comment(comment))
+
+        for item in urls:
+            url = etree.SubElement(root, "url", attrib={}, nsmap=nsmap)
+
+            loc = etree.SubElement(url, "loc", attrib={}, nsmap=nsmap)
+            loc.text = item.loc
+
+            for hreflang, href in item.alternates:
+                attrib = {"rel": "alternate", "hreflang": hreflang, "href": href}
+                etree.SubElement(url, link_tag, attrib=attrib, nsmap=nsmap)
+
+            if item.lastmod is not None:
+                lastmod = etree.SubElement(url, "lastmod", attrib={}, nsmap=nsmap)
+                lastmod.text = item.lastmod
+
+            changefreq = etree.SubElement(url, "changefreq", attrib={}, nsmap=nsmap)
+            changefreq.text = item.changefreq
+
+            priority = etree.SubElement(url, "priority", attrib={}, nsmap=nsmap)
+            priority.text = item.priority
+
+        return XML_HEADER + etree.tostring(root)
+
+
+class BytesRenderer:
+    """Render sitemaps from precomputed byte fragments.
+
+    The output is byte-for-byte identical to the one of `LxmlRenderer`:
+    non-ASCII characters are written as decimal character references and
+    special characters are escaped the same way libxml2 does.
+    """
+
+    def render_urlset(self, urls: Iterable[SitemapUrl], comment: str | None = None) -> bytes:
+        """Render a complete `urlset` document.
+
+        Args:
+            urls (Iterable[SitemapUrl]): URLs of the sitemap.
+            comment (str, optional): comment placed before the first URL.
+
+        Returns:
+            bytes: the XML document with the XML declaration.
+        """
+        from ckanext.sitemap.configs import SITEMAP_NS, XHTML_NS
+
+        parts = [
+            XML_HEADER,
+            f'<urlset xmlns="{SITEMAP_NS}" xmlns:xhtml="{XHTML_NS}"'.encode(),
+            b">",
+        ]
+        if comment:
+            parts.append(_encode(f"<!--{comment}-->"))
+
+        append = parts.append
+        # Section settings repeat in every URL, escape them once per value
+        escaped: dict[str, str] = {}
+
+        for item in urls:
+            changefreq = escaped.get(item.changefreq)
+            if changefreq is None:
+                changefreq = escaped[item.changefreq] = _escape_text(item.changefreq)
+            priority = escaped.get(item.priority)
+            if priority is None:
+                priority = escaped[item.priority] = _escape_text(item.priority)
+
+            append(_encode(_url_block(item, changefreq, priority)))
+
+        if len(parts) == 3:
+            # lxml writes an element without children as a self-closing tag
+            parts[-1] = b"/>"
+        else:
+            append(b"</urlset>")
+        return b"".join(parts)
+
+
+def measure_url(item: SitemapUrl) -> int:
+    """Get the size of the serialized `<url>` element.
+
+    Both engines produce the same bytes, so the size doesn't depend on the
+    selected renderer.
+
+    Args:
+        item (SitemapUrl): values of the element.
+
+    Returns:
+        int: size of the element in bytes.
+    """
+    return len(_encode(
+        _url_block(item, _escape_text(item.changefreq), _escape_text(item.priority))
+    ))
+
+
+def measure_urlset(comment: str | None = None) -> int:
+    """Get the size of a `urlset` document without its `<url>` elements.
+
+    Args:
+        comment (str, optional): comment placed before the first URL.
+
+    Returns:
+        int: size of the XML declaration, the root element and the comment
+            in bytes.
+    """
+    size = len(BytesRenderer().render_urlset([], comment))
+    if not comment:
+        # The root without children is written as a self-closing tag
+        size += len(b"></urlset>") - len(b"/>")
+    return size
+
+
+def _url_block(item: SitemapUrl, changefreq: str, priority: str) -> str:
+    block = "<url><loc>" + _escape_text(item.loc) + "</loc>"
+    for hreflang, href in item.alternates:
+        block += (
+            '<xhtml:link rel="alternate" hreflang="' + _escape_attr(hreflang)
+            + '" href="' + _escape_attr(href) + '"/>'
+        )
+    if item.lastmod is not None:
+        block += "<lastmod>" + _escape_text(item.lastmod) + "</lastmod>"
+    return block + (
+        "<changefreq>" + changefreq + "</changefreq>"
+        "<priority>" + priority + "</priority></url>"
+    )
+
+
+def _encode(value: str) -> bytes:
+    return value.encode("ascii", "xmlcharrefreplace")
+
+
+def _escape_text(value: str) -> str:
+    if "&" in value:
+        value = value.replace("&", "&amp;")
+    if "<" in value:
+        value = value.replace("<", "&lt;")
+    if ">" in value:
+        value = value.replace(">", "&gt;")
+    if "\r" in value:
+        value = value.replace("\r", "&#13;")
+    return value
+
+
+def _escape_attr(value: str) -> str:
+    value = _escape_text(value)
+    if '"' in value:
+        value = value.replace('"', "&quot;")
+    if "\n" in value:
+        value = value.replace("\n", "&#10;")
+    if "\t" in value:
+        value = value.replace("\t", "&#9;")
+    return value
+
+
+RENDERERS = {
+    "lxml": LxmlRenderer,
+    "bytes": BytesRenderer,
+}
+
+
+def get_renderer() -> LxmlRenderer | BytesRenderer:
+    """Get the rendering engine selected by `ckanext.sitemap.renderer`."""
+    from ckanext.sitemap.configs import sitemap_renderer
+
+    return RENDERERS.get(sitemap_renderer(), LxmlRenderer)()
@@ -1,5 +1,6 @@
 import ckan.plugins.toolkit as tk
 from ckanext.sitemap.logic.validators import is_ranged_float
+from ckanext.sitemap.sections import get_sections
 
 
 def sitemap_schema():
@@ -7,33 +8,20 @@ def sitemap_schema():
     natural_number_validator = tk.get_validator("natural_number_validator")
     unicode_safe = tk.get_validator("unicode_safe")
     
-    return {
+    schema = {
         # General section options 
         "date_format": [ignore_empty, unicode_safe],
         "include_hreflang": [ignore_empty],
         "robots_txt": [ignore_empty, unicode_safe],
-        
-        # Pages section options 
-        "pages_limit": [ignore_empty, natural_number_validator],
-        "pages_priority": [ignore_empty, is_ranged_float],
-        "pages_changefreq": [ignore_empty, unicode_safe],
-        "pages_exclude": [ignore_empty],
-        
-        # Dataset section options 
-        "datasets_limit": [ignore_empty, natural_number_validator],
-        "datasets_priority": [ignore_empty, is_ranged_float],
-        "datasets_changefreq": [ignore_empty, unicode_safe],
-        "datasets_exclude": [ignore_empty],
-        
-        # Organizations section options 
-        "organizations_limit": [ignore_empty, natural_number_validator],
-        "organizations_priority": [ignore_empty, is_ranged_float],
-        "organizations_changefreq": [ignore_empty, unicode_safe],
-        "organizations_exclude": [ignore_empty],
-        
-        # Groups section options 
-        "groups_limit": [ignore_empty, natural_number_validator],
-        "groups_priority": [ignore_empty, is_ranged_float],
-        "groups_changefreq": [ignore_empty, unicode_safe],
-        "groups_exclude": [ignore_empty],
     }
+
+    # Options of every section, including ones registered through ISitemap
+    for section in get_sections():
+        schema.update({
+            f"{section}_limit": [ignore_empty, natural_number_validator],
+            f"{section}_priority": [ignore_empty, is_ranged_float],
+            f"{section}_changefreq": [ignore_empty, unicode_safe],
+            f"{section}_exclude": [ignore_empty],
+        })
+
+    return schema
@@ -0,0 +1,413 @@
+"""Sources of sitemap entries.
+
+Every sitemap section is represented by a `SitemapSection` object. Built-in
+sections cover pages, datasets, organizations and groups; other extensions can
+register their own sections through the `ISitemap` interface.
+"""
+
+from __future__ import annotations
+
+import abc
+
+from datetime import datetime
+from typing import Any, Iterator
+
+import ckan.plugins as p
+from ckan.plugins import toolkit as tk
+
+from ckanext.sitemap import configs, popularity, translations, utils
+from ckanext.sitemap.entries import SitemapEntry
+from ckanext.sitemap.interfaces import ISitemap
+
+
+# Number of names looked up with a single query by `get_entries`
+NAMES_BATCH_SIZE = 500
+
+
+class SitemapSection(abc.ABC):
+    """Base class for a source of sitemap entries.
+
+    Subclasses must implement `iter_entries` and `count`. Entries must be
+    produced in a stable order, because the sitemap rendered on request is
+    split into shards by position.
+
+    Attributes:
+        name (str): unique name of the section. It is used in shard URLs and
+            as a prefix of section settings (eg. `<name>_limit`).
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+
+    @abc.abstractmethod
+    def iter_entries(self, offset: int = 0, limit: int | None = None) -> Iterator[SitemapEntry]:
+        """Produce entries of the section.
+
+        Args:
+            offset (int): number of entries to skip.
+            limit (int, optional): maximum number of entries to produce.
+
+        Yields:
+            SitemapEntry: records in a stable order.
+        """
+
+    @abc.abstractmethod
+    def count(self) -> int:
+        """Count all entries of the section without producing them.
+
+        Returns:
+            int: total number of entries.
+        """
+
+    def changed_since(self, since: datetime) -> list[str] | None:
+        """Get names of entries modified after the given moment.
+
+        Args:
+            since (datetime): lower bound of the modification time.
+
+        Returns:
+            list[str] | None: names of modified entries, or None if the
+                section cannot tell what changed and must be treated as
+                changed entirely.
+        """
+        return None
+
+    def get_entries(self, names: list[str]) -> list[SitemapEntry] | None:
+        """Get entries of the section by their names.
+
+        Used by the generator to update a section without enumerating it.
+
+        Args:
+            names (list[str]): names of entries.
+
+        Returns:
+            list[SitemapEntry] | None: entries that are still in the section,
+                in any order, or None if the section cannot look entries up
+                by name and must be enumerated.
+        """
+        return None
+
+    def get_translations(self, entries: list[SitemapEntry]) -> dict[str, set[str]] | None:
+        """Get languages that a batch of entries is translated to.
+
+        Called once per batch of entries when hreflang links are limited to
+        existing translations.
+
+        Args:
+            entries (list[SitemapEntry]): batch of entries.
+
+        Returns:
+            dict[str, set[str]] | None: mapping of entry name to languages
+                with translated content, or None if every offered language
+                should be listed for every entry.
+        """
+        return None
+
+    def get_priorities(self, entries: list[SitemapEntry]) -> dict[str, str] | None:
+        """Get priorities of a batch of entries.
+
+        Called once per batch of entries.
+
+        Args:
+            entries (list[SitemapEntry]): batch of entries.
+
+        Returns:
+            dict[str, str] | None: mapping of entry name to its priority, or
+                None if the `<name>_priority` setting applies to every entry.
+        """
+        return None
+
+
+class PagesSection(SitemapSection):
+    """Static pages from `ckanext.sitemap.indexable_endpoints`."""
+
+    def iter_entries(self, offset: int = 0, limit: int | None = None) -> Iterator[SitemapEntry]:
+        endpoints = utils.get_endpoints_without_arguments()
+        end = None if limit is None else offset + limit
+        for endpoint in endpoints[offset:end]:
+            yield SitemapEntry(endpoint, "page")
+
+    def count(self) -> int:
+        return len(utils.get_endpoints_without_arguments())
+
+
+class DatasetsSection(SitemapSection):
+    """Active public datasets from the search index."""
+
+    def _search(self, data_dict: dict) -> dict:
+        data_dict.update({
+            "include_private": False,
+            "include_drafts": False,
+        })
+        return tk.get_action("package_search")({}, data_dict)
+
+    def _iter_search(
+        self,
+        offset: int = 0,
+        limit: int | None = None,
+        fq: str = "",
+        sort: str = "name asc",
+    ) -> Iterator[SitemapEntry]:
+        # package_search caps `rows`, so fetch the section in batches
+        batch_size = tk.asint(tk.config.get("ckan.search.rows_max", 1000))
+        produced = 0
+        while limit is None or produced < limit:
+            rows = batch_size if limit is None else min(batch_size, limit - produced)
+            results = self._search({
+                "q": "state:active",
+                "fq": fq,
+                "fl": [
+                    "name",
+                    "dataset_type",
+                    "metadata_modified",
+                    "original_path",
+                    "extras_original_path",
+                ],
+                "sort": sort,
+                "rows": rows,
+                "start": offset + produced,
+            })["results"]
+            for result in results:
+                yield SitemapEntry.from_dict(result)
+            produced += len(results)
+            if len(results) < rows:
+                break
+
+    def iter_entries(self, offset: int = 0, limit: int | None = None) -> Iterator[SitemapEntry]:
+        return self._iter_search(offset, limit)
+
+    def count(self) -> int:
+        return self._search({"q": "state:active", "rows": 0})["count"]
+
+    def changed_since(self, since: datetime) -> list[str] | None:
+        from ckan import model
+
+        since_str = since.strftime("%Y-%m-%dT%H:%M:%SZ")
+        fq = f"metadata_modified:[{since_str} TO NOW]"
+        names = [entry.name for entry in self._iter_search(fq=fq)]
+
+        # Deleted and private datasets are not in the search results anymore
+        hidden = (
+            model.Session.query(model.Package.name)
+            .filter(model.Package.metadata_modified >= since)
+            .filter((model.Package.state != "active") | model.Package.private)
+        )
+        names.extend(name for name, in hidden)
+        return names
+
+    def get_entries(self, names: list[str]) -> list[SitemapEntry] | None:
+        entries = []
+        for batch in utils.iter_batches(names, NAMES_BATCH_SIZE):
+            fq = "name:({})".format(" OR ".join(f'"{name}"' for name in batch))
+            entries.extend(self._iter_search(fq=fq))
+        return entries
+
+    def get_recent(self, since: datetime, limit: int) -> list[SitemapEntry]:
+        """Get datasets modified after the given moment.
+
+        Args:
+            since (datetime): lower bound of the modification time.
+            limit (int): maximum number of datasets.
+
+        Returns:
+            list[SitemapEntry]: datasets, the most recently modified first.
+        """
+        since_str = since.strftime("%Y-%m-%dT%H:%M:%SZ")
+        return list(self._iter_search(
+            limit=limit,
+            fq=f"metadata_modified:[{since_str} TO NOW]",
+            sort="metadata_modified desc",
+        ))
+
+    def get_translations(self, entries: list[SitemapEntry]) -> dict[str, set[str]] | None:
+        return translations.get_dataset_translations([entry.name for entry in entries])
+
+    def get_priorities(self, entries: list[SitemapEntry]) -> dict[str, str] | None:
+        return popularity.get_dataset_priorities([entry.name for entry in entries])
+
+
+class DatabaseDatasetsSection(DatasetsSection):
+    """Active public datasets read straight from the `package` table.
+
+    Only `name`, `type` and `metadata_modified` columns and the `original_path`
+    extra are selected, so the section works while the search index is rebuilt
+    or unavailable, and no stored dataset dictionaries are parsed.
+    """
+
+    def _query(self, *columns):
+        from ckan import model
+
+        return (
+            model.Session.query(*columns)
+            .filter(model.Package.state == "active")
+            .filter(model.Package.private.is_(False))
+        )
+
+    def iter_entries(self, offset: int = 0, limit: int | None = None) -> Iterator[SitemapEntry]:
+        from ckan import model
+
+        batch_size = configs.sitemap_database_batch_size()
+        last_name = None
+        produced = 0
+
+        # Keyset pagination: only the first batch skips rows with OFFSET,
+        # every following one continues after the last seen name
+        while limit is None or produced < limit:
+            rows = batch_size if limit is None else min(batch_size, limit - produced)
+            query = self._entries_query().order_by(model.Package.name)
+            if last_name is None:
+                query = query.offset(offset)
+            else:
+                query = query.filter(model.Package.name > last_name)
+
+            fetched = 0
+            for row in query.limit(rows).yield_per(rows):
+                yield _entry_from_row(row)
+                last_name = row[0]
+                fetched += 1
+
+            produced += fetched
+            if fetched < rows:
+                break
+
+    def count(self) -> int:
+        from sqlalchemy import func
+        from ckan import model
+
+        return self._query(func.count(model.Package.id)).scalar()
+
+    def get_entries(self, names: list[str]) -> list[SitemapEntry] | None:
+        from ckan import model
+
+        entries = []
+        for batch in utils.iter_batches(names, NAMES_BATCH_SIZE):
+            query = self._entries_query().filter(model.Package.name.in_(batch))
+            entries.extend(_entry_from_row(row) for row in query)
+        return entries
+
+    def get_recent(self, since: datetime, limit: int) -> list[SitemapEntry]:
+        from ckan import model
+
+        query = (
+            self._entries_query()
+            .filter(model.Package.metadata_modified >= since)
+            .order_by(model.Package.metadata_modified.desc())
+            .limit(limit)
+        )
+        return [_entry_from_row(row) for row in query]
+
+    def _entries_query(self):
+        """Select columns of entries together with the `original_path` extra."""
+        from ckan import model
+
+        original_path = (model.PackageExtra.package_id == model.Package.id) & (
+            model.PackageExtra.key == "original_path"
+        )
+        return self._query(
+            model.Package.name,
+            model.Package.type,
+            model.Package.metadata_modified,
+            model.PackageExtra.value,
+        ).outerjoin(model.PackageExtra, original_path)
+
+    def changed_since(self, since: datetime) -> list[str] | None:
+        from ckan import model
+
+        # Deleted and private datasets are included, as they must be removed
+        query = (
+            model.Session.query(model.Package.name)
+            .filter(model.Package.metadata_modified >= since)
+        )
+        return [name for name, in query]
+
+
+class GroupsSection(SitemapSection):
+    """Active groups of a single type, eg. organizations or groups."""
+
+    def __init__(self, name: str, group_type: str):
+        super().__init__(name)
+        self.group_type = group_type
+
+    def iter_entries(self, offset: int = 0, limit: int | None = None) -> Iterator[SitemapEntry]:
+        action = "organization_list" if self.group_type == "organization" else "group_list"
+        # group lists are capped, so fetch the section in batches
+        batch_size = tk.asint(tk.config.get("ckan.group_and_organization_list_max", 1000))
+        produced = 0
+        while limit is None or produced < limit:
+            rows = batch_size if limit is None else min(batch_size, limit - produced)
+            names = tk.get_action(action)(
+                {},
+                {
+                    "type": self.group_type,
+                    "sort": "name asc",
+                    "limit": rows,
+                    "offset": offset + produced,
+                    "all_fields": False,
+                },
+            )
+            for name in names:
+                yield SitemapEntry(name, self.group_type)
+            produced += len(names)
+            if len(names) < rows:
+                break
+
+    def _query(self):
+        from ckan import model
+
+        return (
+            model.Session.query(model.Group)
+            .filter(model.Group.state == "active")
+            .filter(model.Group.type == self.group_type)
+        )
+
+    def count(self) -> int:
+        return self._query().count()
+
+    def changed_since(self, since: datetime) -> list[str] | None:
+        from ckan import model
+
+        # Groups have no modification date, only new ones can be detected
+        query = self._query().filter(model.Group.created >= since)
+        return [group.name for group in query.with_entities(model.Group.name)]
+
+    def get_translations(self, entries: list[SitemapEntry]) -> dict[str, set[str]] | None:
+        return translations.get_group_translations([entry.name for entry in entries])
+
+
+def _entry_from_row(row: tuple[Any, ...]) -> SitemapEntry:
+    name, type_, modified, path = row
+    return SitemapEntry(name, type_, path or None, modified and modified.isoformat())
+
+
+def get_datasets_section() -> DatasetsSection:
+    """Get the built-in datasets section of `ckanext.sitemap.datasets_source`."""
+    if configs.sitemap_datasets_source() == "database":
+        return DatabaseDatasetsSection("datasets")
+    return DatasetsSection("datasets")
+
+
+def get_builtin_sections() -> list[SitemapSection]:
+    """Get sections provided by the sitemap plugin itself."""
+    return [
+        PagesSection("pages"),
+        get_datasets_section(),
+        GroupsSection("organizations", "organization"),
+        GroupsSection("groups", "group"),
+    ]
+
+
+def get_sections() -> dict[str, SitemapSection]:
+    """Get all available sitemap sections.
+
+    Built-in sections listed in `configs.SITEMAP_SECTIONS` go first, followed by
+    sections registered by plugins implementing `ISitemap`. A plugin section
+    with the name of an existing section replaces it.
+
+    Returns:
+        dict[str, SitemapSection]: mapping of section name to section.
+    """
+    sections = {section.name: section for section in get_builtin_sections()}
+    for plugin in p.PluginImplementations(ISitemap):
+        for section in plugin.get_sitemap_sections():
+            sections[section.name] = section
+    return sections
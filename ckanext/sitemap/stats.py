@@ -0,0 +1,130 @@
+"""Generation statistics of sitemap plugin.
+
+Statistics are kept in Redis, so every CKAN worker reports the same values
+and recording them does not touch the main database.
+"""
+
+from __future__ import annotations
+
+import json
+
+from datetime import datetime
+from typing import Any
+
+
+GENERATION_KEY = "ckanext:sitemap:generation"
+CRAWLERS_KEY = "ckanext:sitemap:crawlers"
+DUPLICATES_KEY = "ckanext:sitemap:duplicates"
+CRAWLER_METRICS = ("requests", "not_modified", "bytes", "duration")
+
+
+def record_generation(
+    section: str, generated_at: datetime, duration: float, count: int
+) -> None:
+    """Store information about the latest generation of a sitemap section.
+
+    Args:
+        section (str): name of the sitemap section.
+        generated_at (datetime): moment when the generation started.
+        duration (float): generation time in seconds.
+        count (int): number of URLs written for the section.
+    """
+    from ckan.lib.redis import connect_to_redis
+
+    info = {
+        "generated_at": generated_at.isoformat(),
+        "duration": round(duration, 6),
+        "count": count,
+    }
+    connect_to_redis().hset(GENERATION_KEY, section, json.dumps(info))
+
+
+def get_generation_info() -> dict[str, dict[str, Any]]:
+    """Get information about the latest generation of every sitemap section.
+
+    Returns:
+        dict[str, dict[str, Any]]: mapping of section name to its generation
+            details (generated_at, duration, count).
+    """
+    from ckan.lib.redis import connect_to_redis
+
+    data = connect_to_redis().hgetall(GENERATION_KEY)
+    return {
+        _as_str(section): json.loads(info)
+        for section, info in data.items()
+    }
+
+
+def record_duplicates(duplicates: dict[str, int]) -> None:
+    """Store the number of duplicate URLs found by the latest generation.
+
+    Args:
+        duplicates (dict[str, int]): mapping of section name to the number of
+            its entries whose URL was already listed.
+    """
+    from ckan.lib.redis import connect_to_redis
+
+    pipeline = connect_to_redis().pipeline()
+    pipeline.delete(DUPLICATES_KEY)
+    if duplicates:
+        pipeline.hset(DUPLICATES_KEY, mapping=duplicates)
+    pipeline.execute()
+
+
+def get_duplicates() -> dict[str, int]:
+    """Get the number of duplicate URLs per section found by the latest generation."""
+    from ckan.lib.redis import connect_to_redis
+
+    data = connect_to_redis().hgetall(DUPLICATES_KEY)
+    return {_as_str(section): int(count) for section, count in data.items()}
+
+
+def record_crawler_requests(counters: dict[tuple[str, str], list]) -> None:
+    """Add aggregated crawler requests to the stored totals.
+
+    All counters are sent to Redis in a single pipeline.
+
+    Args:
+        counters (dict[tuple[str, str], list]): mapping of crawler name and
+            sitemap file name to the number of requests, the number of
+            `304 Not Modified` responses, sent bytes and processing time.
+    """
+    from ckan.lib.redis import connect_to_redis
+
+    pipeline = connect_to_redis().pipeline(transaction=False)
+    for (agent, name), values in counters.items():
+        for metric, value in zip(CRAWLER_METRICS, values):
+            field = f"{agent}|{name}|{metric}"
+            if isinstance(value, float):
+                pipeline.hincrbyfloat(CRAWLERS_KEY, field, value)
+            else:
+                pipeline.hincrby(CRAWLERS_KEY, field, value)
+    pipeline.execute()
+
+
+def get_crawler_stats() -> dict[str, dict[str, dict[str, Any]]]:
+    """Get totals of crawler requests to sitemap files.
+
+    Returns:
+        dict[str, dict[str, dict[str, Any]]]: mapping of crawler name to
+            sitemap file name to its metrics (requests, not_modified, bytes
+            and average duration in seconds).
+    """
+    from ckan.lib.redis import connect_to_redis
+
+    result: dict[str, dict[str, dict[str, Any]]] = {}
+    for field, value in connect_to_redis().hgetall(CRAWLERS_KEY).items():
+        agent, name, metric = _as_str(field).rsplit("|", 2)
+        value = _as_str(value)
+        metrics = result.setdefault(agent, {}).setdefault(name, {})
+        metrics[metric] = float(value) if metric == "duration" else int(value)
+
+    for files in result.values():
+        for metrics in files.values():
+            requests = metrics.get("requests", 0)
+            metrics["duration"] = metrics.get("duration", 0.0) / requests if requests else 0.0
+    return result
+
+
+def _as_str(value: str | bytes) -> str:
+    return value.decode("utf-8") if isinstance(value, bytes) else value
@@ -0,0 +1,244 @@
+"""Load-test harness that replays crawler traffic against sitemap endpoints.
+
+The harness drives any WSGI application through test clients, so it works
+with the CKAN test app (the `app` fixture of pytest-ckan), with an app built
+from a config file (see `benchmarks/load.py`) or with a bare Flask app that
+registers the sitemap blueprint over stubbed actions. Requests are made by a
+pool of threads to expose concurrency problems of views and middlewares, not
+only the speed of a single request.
+
+Scenarios follow what crawlers do:
+- `burst`: many concurrent fetches of the same URL, eg. `/sitemap.xml`
+- `refetch`: conditional re-fetches with `If-None-Match`/`If-Modified-Since`
+- `fanout`: fetch of the sitemap index followed by all of its child sitemaps
+
+Example:
+
+    >>> load = CrawlerLoad(app.test_client, concurrency=8)
+    >>> report = load.burst("/sitemap.xml", 100)
+    >>> report.errors, report.p99
+    (0, 0.0123)
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import resource
+import sys
+import threading
+import time
+
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator
+from urllib.parse import urlsplit
+
+
+LOC = re.compile(rb"<loc>([^<]+)</loc>")
+GOOGLEBOT = "Mozilla/5.0 (compatible; Googlebot/2.1; +http://www.google.com/bot.html)"
+
+
+class LoadReport:
+    """Results of a load-test scenario.
+
+    Attributes:
+        requests (int): number of made requests.
+        statuses (Counter): number of responses per HTTP status.
+        errors (int): number of requests that raised an exception or got a
+            5xx response.
+        failed_checks (int): number of responses rejected by the check.
+        duration (float): wall time of the scenario in seconds.
+        latencies (list[float]): sorted response times in seconds.
+        db_queries (int | None): number of database queries, None if they
+            were not counted.
+        rss_before (int): resident memory of the process before the scenario, bytes.
+        rss_after (int): resident memory of the process after the scenario, bytes.
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.statuses: Counter = Counter()
+        self.errors = 0
+        self.failed_checks = 0
+        self.duration = 0.0
+        self.latencies: list[float] = []
+        self.db_queries: int | None = None
+        self.rss_before = 0
+        self.rss_after = 0
+
+    @property
+    def throughput(self) -> float:
+        """Requests per second."""
+        return self.requests / self.duration if self.duration else 0.0
+
+    @property
+    def p50(self) -> float:
+        return self.percentile(50)
+
+    @property
+    def p99(self) -> float:
+        return self.percentile(99)
+
+    def percentile(self, value: float) -> float:
+        if not self.latencies:
+            return 0.0
+        index = min(len(self.latencies) - 1, int(len(self.latencies) * value / 100))
+        return self.latencies[index]
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "statuses": dict(self.statuses),
+            "errors": self.errors,
+            "failed_checks": self.failed_checks,
+            "throughput": round(self.throughput, 1),
+            "p50_ms": round(self.p50 * 1000, 2),
+            "p99_ms": round(self.p99 * 1000, 2),
+            "db_queries": self.db_queries,
+            "rss_mib": round(self.rss_after / 1024 / 1024, 1),
+            "rss_growth_mib": round((self.rss_after - self.rss_before) / 1024 / 1024, 1),
+        }
+
+
+class CrawlerLoad:
+    """Replay crawler request patterns with a pool of threads.
+
+    Args:
+        client_factory (Callable): creates a test client with the `get(url,
+            headers=...)` method. Every thread uses its own client.
+        concurrency (int): number of threads making requests.
+        count_queries (bool): count database queries made by the scenario.
+            Requires initialized CKAN models.
+        user_agent (str): User-Agent header of the requests.
+        check (Callable, optional): validates every response, eg. that the
+            headers added by a middleware are consistent under concurrency.
+    """
+
+    def __init__(
+        self,
+        client_factory: Callable[[], Any],
+        concurrency: int = 8,
+        count_queries: bool = False,
+        user_agent: str = GOOGLEBOT,
+        check: Callable[[Any], bool] | None = None,
+    ):
+        self.client_factory = client_factory
+        self.concurrency = concurrency
+        self.count_queries = count_queries
+        self.user_agent = user_agent
+        self.check = check
+        self._local = threading.local()
+
+    def burst(self, url: str, requests: int) -> LoadReport:
+        """Fetch the same URL concurrently.
+
+        Args:
+            url (str): path of the sitemap, eg. `/sitemap.xml`.
+            requests (int): total number of requests.
+        """
+        return self._run([(url, {})] * requests)
+
+    def refetch(self, url: str, requests: int) -> LoadReport:
+        """Re-fetch the URL concurrently with validators of the first response.
+
+        Unchanged sitemaps are expected to produce `304 Not Modified`.
+
+        Args:
+            url (str): path of the sitemap, eg. `/sitemap.xml`.
+            requests (int): total number of conditional requests.
+        """
+        response = self._get(url, {})
+        headers = {}
+        if response.headers.get("ETag"):
+            headers["If-None-Match"] = response.headers["ETag"]
+        if response.headers.get("Last-Modified"):
+            headers["If-Modified-Since"] = response.headers["Last-Modified"]
+        return self._run([(url, headers)] * requests)
+
+    def fanout(
+        self, url: str = "/sitemap.xml", rounds: int = 1, warm: bool = False
+    ) -> LoadReport:
+        """Fetch the sitemap index and then every child sitemap concurrently.
+
+        Args:
+            url (str): path of the sitemap index.
+            rounds (int): number of times every child sitemap is fetched.
+            warm (bool): fetch every child sitemap once before the concurrent
+                requests, so that requests arriving during a rendering get the
+                last rendered copy instead of `503`.
+        """
+        response = self._get(url, {})
+        children = [
+            urlsplit(loc.decode()).path for loc in LOC.findall(response.data)
+        ]
+        if warm:
+            for child in children:
+                self._get(child, {})
+        return self._run([(child, {}) for child in children] * rounds)
+
+    def _run(self, requests: list[tuple[str, dict[str, str]]]) -> LoadReport:
+        report = LoadReport()
+        lock = threading.Lock()
+
+        def fetch(request: tuple[str, dict[str, str]]):
+            url, headers = request
+            started = time.perf_counter()
+            try:
+                response = self._get(url, headers)
+            except Exception:
+                response = None
+            latency = time.perf_counter() - started
+            failed = bool(response and self.check and not self.check(response))
+
+            with lock:
+                report.requests += 1
+                report.latencies.append(latency)
+                report.failed_checks += failed
+                if response is None or response.status_code >= 500:
+                    report.errors += 1
+                if response is not None:
+                    report.statuses[response.status_code] += 1
+
+        report.rss_before = _get_rss()
+        with self._counting() as calls:
+            started = time.perf_counter()
+            with ThreadPoolExecutor(self.concurrency) as executor:
+                list(executor.map(fetch, requests))
+            report.duration = time.perf_counter() - started
+        report.rss_after = _get_rss()
+
+        if calls is not None:
+            report.db_queries = calls["db_queries"]
+        report.latencies.sort()
+        return report
+
+    def _get(self, url: str, headers: dict[str, str]):
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = self.client_factory()
+        return client.get(url, headers={"User-Agent": self.user_agent, **headers})
+
+    @contextmanager
+    def _counting(self) -> Iterator[dict[str, int] | None]:
+        if not self.count_queries:
+            yield None
+            return
+
+        from ckanext.sitemap.profiling import count_calls
+
+        with count_calls() as calls:
+            yield calls
+
+
+def _get_rss() -> int:
+    """Get the current resident memory of the process in bytes."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        # Without procfs only the peak value is available, macOS reports it
+        # in bytes, other systems in kilobytes
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
@@ -0,0 +1,101 @@
+import pytest
+
+from ckanext.sitemap.assignments import ShardAssignment
+from ckanext.sitemap.entries import SitemapEntry
+
+
+def entries(*names: str) -> list[SitemapEntry]:
+    return [SitemapEntry(name, "dataset") for name in names]
+
+
+def shards_of(assignment: ShardAssignment) -> dict[int, list[str]]:
+    return assignment.get_members(set(assignment.shards.values()))
+
+
+@pytest.fixture
+def assignment():
+    names = "bcdefg"
+    return ShardAssignment(
+        "datasets", 2, {name: i // 2 + 1 for i, name in enumerate(names)}
+    )
+
+
+class TestUpdate:
+    def test_unchanged_entries_keep_shards(self, assignment):
+        members, changed = assignment.update(entries(*"bcdefg"), 10)
+
+        assert changed == set()
+        assert {shard: [e.name for e in items] for shard, items in members.items()} == {
+            1: ["b", "c"], 2: ["d", "e"], 3: ["f", "g"],
+        }
+
+    def test_insert_at_front_touches_one_shard(self, assignment):
+        _members, changed = assignment.update(entries(*"abcdefg"), 10)
+
+        assert changed == {4}
+        assert shards_of(assignment) == {
+            1: ["b", "c"], 2: ["d", "e"], 3: ["f", "g"], 4: ["a"],
+        }
+
+    def test_removal_touches_one_shard(self, assignment):
+        _members, changed = assignment.update(entries(*"bcefg"), 10)
+
+        assert changed == {2}
+        assert shards_of(assignment) == {1: ["b", "c"], 2: ["e"], 3: ["f", "g"]}
+
+    def test_new_entry_fills_the_free_slot(self, assignment):
+        assignment.update(entries(*"bcefg"), 10)
+        _members, changed = assignment.update(entries(*"abcefg"), 10)
+
+        assert changed == {2}
+        assert shards_of(assignment) == {1: ["b", "c"], 2: ["a", "e"], 3: ["f", "g"]}
+
+    def test_lowered_limit_removes_last_entries(self, assignment):
+        members, changed = assignment.update(entries(*"bcdefg"), 3)
+
+        assert changed == {2, 3}
+        assert set(members) == {1, 2}
+        assert shards_of(assignment) == {1: ["b", "c"], 2: ["d"]}
+
+    def test_lowered_shard_size_moves_last_entries(self, assignment):
+        assignment.shard_size = 1
+        members, changed = assignment.update(entries(*"bcdefg"), 10)
+
+        assert changed == {1, 2, 3, 4, 5, 6}
+        assert all(len(items) == 1 for items in members.values())
+        assert shards_of(assignment) == {
+            1: ["b"], 2: ["d"], 3: ["f"], 4: ["g"], 5: ["e"], 6: ["c"],
+        }
+
+    def test_closed_shards_get_no_new_entries(self, assignment):
+        assignment.update(entries(*"bcefg"), 10)
+        _members, changed = assignment.update(entries(*"abcefg"), 10, closed={2})
+
+        assert changed == {4}
+        assert assignment.shards["a"] == 4
+
+
+class TestIncrementalChanges:
+    def test_add_touches_one_shard(self, assignment):
+        assert assignment.add(["a"], 10) == {4}
+        assert assignment.shards["a"] == 4
+
+    def test_remove_touches_one_shard(self, assignment):
+        assert assignment.remove(["d", "unknown"]) == {2}
+        assert "d" not in assignment.shards
+
+    def test_add_respects_the_limit(self, assignment):
+        assert assignment.add(["a", "h"], 7) == {4}
+        assert "h" not in assignment.shards
+
+    def test_lowered_limit_removes_last_entries(self, assignment):
+        assert assignment.add([], 3) == {2, 3}
+        assert shards_of(assignment) == {1: ["b", "c"], 2: ["d"]}
+
+    def test_lowered_shard_size_moves_last_entries(self, assignment):
+        assignment.shard_size = 1
+
+        assert assignment.add([], 10) == {1, 2, 3, 4, 5, 6}
+        assert shards_of(assignment) == {
+            1: ["b"], 2: ["d"], 3: ["f"], 4: ["g"], 5: ["e"], 6: ["c"],
+        }
@@ -0,0 +1,21 @@
+import random
+
+import pytest
+
+from ckanext.sitemap.dedup import UrlDeduplicator
+
+
+@pytest.mark.parametrize("exact_limit", [0, 100, 100000])
+def test_duplicates_are_detected_exactly(exact_limit):
+    rnd = random.Random(42)
+    urls = [f"http://localhost:5000/dataset/{rnd.randrange(3000)}" for _ in range(6000)]
+
+    with UrlDeduplicator(exact_limit) as seen:
+        result = [seen.add(url) for url in urls]
+
+    expected = []
+    unique = set()
+    for url in urls:
+        expected.append(url not in unique)
+        unique.add(url)
+    assert result == expected
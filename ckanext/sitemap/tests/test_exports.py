@@ -0,0 +1,34 @@
+import json
+
+from ckanext.sitemap import exports
+from ckanext.sitemap.renderers import SitemapUrl
+
+
+URLS = [
+    SitemapUrl("http://localhost:5000/dataset/simple", "2024-06-01", "daily", "0.5"),
+    SitemapUrl(
+        "http://localhost:5000/dataset/ďáta",
+        "2024-06-01",
+        "weekly",
+        "1.0",
+        (("uk", "http://localhost:5000/uk/dataset/ďáta"),),
+    ),
+]
+
+
+def test_text_export_lists_one_url_per_line():
+    content = exports.render("txt", URLS, "datasets")
+
+    assert content.decode("utf-8").splitlines() == [url.loc for url in URLS]
+
+
+def test_json_lines_export():
+    content = exports.render("jsonl", URLS, "datasets")
+
+    lines = [json.loads(line) for line in content.decode("utf-8").splitlines()]
+    assert lines[1] == {
+        "loc": "http://localhost:5000/dataset/ďáta",
+        "lastmod": "2024-06-01",
+        "section": "datasets",
+        "alternates": [{"hreflang": "uk", "href": "http://localhost:5000/uk/dataset/ďáta"}],
+    }
@@ -0,0 +1,62 @@
+"""Concurrency checks of sitemap endpoints under crawler-like traffic.
+
+The scenarios are small enough to run with the rest of the tests. Use
+`benchmarks/load.py` to measure throughput and latency on a real portal.
+"""
+import pytest
+
+from ckan.tests import factories
+
+from ckanext.sitemap.generator import SitemapGenerator
+from ckanext.sitemap.tests.crawler_load import CrawlerLoad
+
+
+def is_xml(response) -> bool:
+    return response.status_code != 200 or response.data.startswith(b"<?xml")
+
+
+@pytest.fixture
+def datasets():
+    return [factories.Dataset() for _ in range(5)]
+
+
+@pytest.mark.ckan_config("ckan.plugins", "sitemap")
+@pytest.mark.ckan_config("ckanext.sitemap.shard_size", 2)
+@pytest.mark.usefixtures("with_plugins", "clean_db", "clean_index", "datasets")
+class TestCrawlerLoad:
+    def test_concurrent_index_fetches(self, app):
+        # Without a rendered copy, requests during the first rendering get 503
+        app.get("/sitemap.xml")
+        report = CrawlerLoad(app.test_client, check=is_xml).burst("/sitemap.xml", 40)
+
+        assert report.errors == 0
+        assert report.failed_checks == 0
+        assert report.statuses == {200: 40}
+
+    def test_concurrent_shard_fanout(self, app):
+        report = CrawlerLoad(app.test_client, check=is_xml).fanout(rounds=5, warm=True)
+
+        assert report.errors == 0
+        assert report.failed_checks == 0
+        # 5 datasets in shards of 2, plus the static pages
+        assert report.requests >= 15
+        assert set(report.statuses) == {200}
+
+    def test_conditional_refetches_of_generated_files(
+        self, app, ckan_config, monkeypatch, tmp_path, migrate_db_for
+    ):
+        migrate_db_for("sitemap")
+        load = CrawlerLoad(app.test_client, count_queries=True)
+        rendered = load.burst("/sitemap.xml", 40)
+
+        monkeypatch.setitem(ckan_config, "ckanext.sitemap.storage_path", str(tmp_path))
+        with app.flask_app.test_request_context():
+            SitemapGenerator().generate()
+
+        report = load.refetch("/sitemap.xml", 40)
+
+        assert report.errors == 0
+        assert report.statuses == {304: 40}
+
+        # Generated files are served without rendering
+        assert report.db_queries < rendered.db_queries
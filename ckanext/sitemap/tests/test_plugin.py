@@ -47,6 +47,9 @@ To temporary patch the CKAN configuration for the duration of a test you can use
     def test_some_action():
         pass
 """
+import subprocess
+import sys
+
 import pytest
 from ckan.plugins import plugin_loaded
 import ckanext.sitemap.plugin as plugin
@@ -56,3 +59,16 @@ import ckanext.sitemap.plugin as plugin
 @pytest.mark.usefixtures("with_plugins")
 def test_plugin():
     assert plugin_loaded("sitemap")
+
+
+def test_plugin_import_is_lightweight():
+    code = (
+        "import sys, ckanext.sitemap.plugin;"
+        "print([m for m in ('lxml.etree', 'ckanext.sitemap.utils',"
+        " 'ckanext.sitemap.views.admin') if m in sys.modules])"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], check=True, capture_output=True, text=True
+    ).stdout
+
+    assert output.strip() == "[]"
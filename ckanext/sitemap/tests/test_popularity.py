@@ -0,0 +1,53 @@
+import pytest
+
+from sqlalchemy.exc import ProgrammingError
+
+from ckan import model
+
+from ckanext.sitemap import configs, popularity
+
+
+@pytest.fixture
+def source(monkeypatch):
+    monkeypatch.setattr(configs, "sitemap_priority_source", lambda: "views")
+    monkeypatch.setattr(popularity, "_cache", None)
+
+
+@pytest.mark.usefixtures("source")
+class TestDatasetPriorities:
+    def test_counts_are_scaled_logarithmically(self, monkeypatch):
+        counts = {"top": 999, "popular": 99, "rare": 9, "unseen": 0}
+        monkeypatch.setattr(popularity, "_get_highest_count", lambda source: 999)
+        monkeypatch.setattr(
+            popularity,
+            "_get_counts",
+            lambda source, names: {name: counts[name] for name in names},
+        )
+
+        assert popularity.get_dataset_priorities(list(counts)) == {
+            "top": "1.0",
+            "popular": "0.7",
+            "rare": "0.3",
+            "unseen": "0.0",
+        }
+
+    def test_missing_tracking_table_falls_back_to_static(self, monkeypatch):
+        def fail(*args):
+            raise ProgrammingError("SELECT", {}, Exception("no tracking_summary"))
+
+        rollbacks = []
+        monkeypatch.setattr(popularity, "_get_highest_count", fail)
+        monkeypatch.setattr(popularity, "_get_counts", fail)
+        monkeypatch.setattr(model.Session, "rollback", lambda: rollbacks.append(1))
+
+        assert popularity.get_dataset_priorities(["a"]) is None
+        assert popularity.get_dataset_priorities(["b"]) is None
+
+        # The failure is remembered until the cache expires
+        assert rollbacks == [1]
+
+
+def test_unknown_source_is_static(ckan_config, monkeypatch):
+    monkeypatch.setitem(ckan_config, configs.SITEMAP_PRIORITY_SOURCE, "stars")
+
+    assert configs.sitemap_priority_source() == "static"
@@ -0,0 +1,84 @@
+import os
+
+import pytest
+
+from ckanext.sitemap.renderers import (
+    RENDERERS,
+    SitemapUrl,
+    measure_url,
+    measure_urlset,
+)
+
+
+GOLDEN = os.path.join(os.path.dirname(__file__), "data", "urlset.xml")
+
+URLS = [
+    SitemapUrl(
+        "http://localhost:5000/dataset/simple",
+        "2024-06-01",
+        "daily",
+        "0.5",
+    ),
+    SitemapUrl(
+        "http://localhost:5000/dataset/search?q=a&sort=name+asc",
+        "2024-06-01T10:00:00+00:00",
+        "weekly",
+        "1.0",
+        (
+            ("x-default", "http://localhost:5000/dataset/search?q=a&sort=name+asc"),
+            ("en", "http://localhost:5000/en/dataset/search?q=a&sort=name+asc"),
+        ),
+    ),
+    SitemapUrl(
+        'http://localhost:5000/page/<"quoted">\'single\'',
+        "2024-06-01",
+        "monthly",
+        "0.3",
+        (("x-default", 'http://localhost:5000/page/<"quoted">\'single\''),),
+    ),
+    SitemapUrl(
+        "http://localhost:5000/uk/набір-даних/ďáta-ñame-数据",
+        "2024-06-01",
+        "never",
+        "0.0",
+        (
+            ("uk", "http://localhost:5000/uk/набір-даних/ďáta-ñame-数据"),
+            ("pt_BR", "http://localhost:5000/pt_BR/path\twith\nwhitespace\r"),
+        ),
+    ),
+]
+
+
+@pytest.mark.parametrize("engine", sorted(RENDERERS))
+def test_render_urlset_matches_golden_file(engine):
+    with open(GOLDEN, "rb") as golden:
+        expected = golden.read()
+
+    content = RENDERERS[engine]().render_urlset(URLS, comment="========== Datasets ==========")
+
+    assert content == expected
+
+
+@pytest.mark.parametrize("engine", sorted(RENDERERS))
+def test_render_empty_urlset(engine):
+    content = RENDERERS[engine]().render_urlset([])
+
+    assert content == RENDERERS["lxml"]().render_urlset([])
+
+
+@pytest.mark.parametrize("comment", [None, "========== Datasets =========="])
+def test_measured_size_matches_rendered_size(comment):
+    content = RENDERERS["lxml"]().render_urlset(URLS, comment=comment)
+
+    assert len(content) == measure_urlset(comment) + sum(map(measure_url, URLS))
+
+
+@pytest.mark.parametrize("engine", sorted(RENDERERS))
+def test_url_without_lastmod(engine):
+    urls = [SitemapUrl("http://localhost:5000/about", None, "monthly", "0.5")]
+
+    content = RENDERERS[engine]().render_urlset(urls)
+
+    assert b"<lastmod>" not in content
+    assert content == RENDERERS["lxml"]().render_urlset(urls)
+    assert len(content) == measure_urlset() + measure_url(urls[0])
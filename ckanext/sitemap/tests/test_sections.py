@@ -0,0 +1,35 @@
+import pytest
+
+from ckan.plugins import toolkit as tk
+from ckan.tests import factories
+
+from ckanext.sitemap import recent
+
+
+@pytest.mark.ckan_config("ckan.plugins", "sitemap")
+@pytest.mark.usefixtures("with_plugins", "clean_db", "clean_index")
+@pytest.mark.parametrize("source", ["search", "database"])
+def test_dataset_is_listed_at_original_path(app, ckan_config, monkeypatch, source):
+    monkeypatch.setitem(ckan_config, "ckanext.sitemap.datasets_source", source)
+    factories.Dataset(extras=[{"key": "original_path", "value": "/legacy/dataset"}])
+
+    response = app.get("/sitemap/datasets-1.xml")
+
+    loc = tk.config["ckan.site_url"].rstrip("/") + "/legacy/dataset"
+    assert f"<loc>{loc}</loc>" in response.body
+
+
+@pytest.mark.ckan_config("ckan.plugins", "sitemap")
+@pytest.mark.ckan_config("ckanext.sitemap.recent_hours", 24)
+@pytest.mark.usefixtures("with_plugins", "clean_db", "clean_index")
+@pytest.mark.parametrize("source", ["search", "database"])
+def test_recent_dataset_is_listed_at_original_path(app, ckan_config, monkeypatch, source):
+    monkeypatch.setitem(ckan_config, "ckanext.sitemap.datasets_source", source)
+    factories.Dataset(extras=[{"key": "original_path", "value": "/legacy/dataset"}])
+    # Seed the buffer from the datasets source instead of notifications
+    monkeypatch.setattr(recent, "_recent_changes", None)
+
+    response = app.get("/sitemap/recent.xml")
+
+    loc = tk.config["ckan.site_url"].rstrip("/") + "/legacy/dataset"
+    assert f"<loc>{loc}</loc>" in response.body
@@ -0,0 +1,310 @@
+"""Rate limiting and load shedding of sitemap requests.
+
+Requests to sitemap endpoints take tokens from two token buckets: one per
+client address and one shared by all clients. A client that runs out of
+tokens gets `429 Too Many Requests`, and when the global bucket is empty every
+client gets `503 Service Unavailable`; both carry `Retry-After`.
+
+Dynamic rendering of a sitemap file is performed by one request at a time.
+Concurrent requests for the same file get the last rendered copy instead of
+starting another rendering.
+
+Bucket state, in-flight markers and last rendered copies are kept in worker
+memory, or in Redis when `ckanext.sitemap.rate_limit_backend` is set to
+"redis", so that limits and copies are shared by all workers. The memory
+backend keeps only the most recently used copies up to
+`MAX_MEMORY_COPIES_SIZE` bytes, and Redis copies expire after
+`RENDERED_TTL` seconds.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+
+from collections import OrderedDict
+from typing import Callable, Iterable, Iterator
+
+from ckanext.sitemap import configs
+
+
+BUCKET_KEY = "ckanext:sitemap:bucket:{}"
+RENDERING_KEY = "ckanext:sitemap:rendering:{}"
+RENDERED_KEY = "ckanext:sitemap:rendered:{}"
+
+# Buckets of the memory backend are pruned once there are this many of them
+MAX_MEMORY_BUCKETS = 10000
+
+# Total size of rendered copies kept by the memory backend
+MAX_MEMORY_COPIES_SIZE = 32 * 1024 * 1024
+
+# In-flight markers expire if the worker dies in the middle of rendering
+RENDERING_TTL = 300
+
+# Rendered copies in Redis expire if the file is not rendered again
+RENDERED_TTL = 3600
+
+# Seconds to wait when a file is being rendered and there is no previous copy
+RENDERING_RETRY_AFTER = 10
+
+# Refill the bucket, take a token and report seconds until the next one
+TAKE_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local state = redis.call("HMGET", KEYS[1], "tokens", "updated")
+local tokens = tonumber(state[1]) or burst
+local updated = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call("HSET", KEYS[1], "tokens", tostring(tokens), "updated", tostring(now))
+redis.call("EXPIRE", KEYS[1], math.ceil(burst / rate) + 1)
+return tostring(wait)
+"""
+
+
+class MemoryBackend:
+    """Token buckets, in-flight markers and rendered copies of the current worker."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # key -> tokens, moment of the last update, moment the bucket is full
+        self._buckets: dict[str, tuple[float, float, float]] = {}
+        self._rendering: set[str] = set()
+        # Least recently used copies come first
+        self._copies: OrderedDict[str, bytes] = OrderedDict()
+        self._copies_size = 0
+
+    def take(self, key: str, rate: float, burst: int) -> float:
+        """Take a token from the bucket.
+
+        Args:
+            key (str): bucket identifier.
+            rate (float): number of tokens added per second.
+            burst (int): capacity of the bucket.
+
+        Returns:
+            float: 0 if the token was taken, otherwise the number of seconds
+                until the next token is available.
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated, _ = self._buckets.get(key, (burst, now, now))
+            tokens = min(burst, tokens + (now - updated) * rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / rate
+            self._buckets[key] = (tokens, now, now + (burst - tokens) / rate)
+
+            if len(self._buckets) > MAX_MEMORY_BUCKETS:
+                # A refilled bucket is the same as a missing one
+                self._buckets = {
+                    key: bucket for key, bucket in self._buckets.items()
+                    if bucket[2] > now
+                }
+        return wait
+
+    def acquire(self, name: str) -> bool:
+        """Mark the sitemap file as being rendered.
+
+        Returns:
+            bool: False if the file is already being rendered.
+        """
+        with self._lock:
+            if name in self._rendering:
+                return False
+            self._rendering.add(name)
+            return True
+
+    def release(self, name: str):
+        with self._lock:
+            self._rendering.discard(name)
+
+    def get_copy(self, name: str) -> bytes | None:
+        """Get the last rendered copy of the sitemap file."""
+        with self._lock:
+            content = self._copies.get(name)
+            if content is not None:
+                self._copies.move_to_end(name)
+            return content
+
+    def set_copy(self, name: str, content: bytes):
+        """Keep the rendered copy, evicting the least recently used ones."""
+        with self._lock:
+            previous = self._copies.pop(name, None)
+            if previous is not None:
+                self._copies_size -= len(previous)
+            if len(content) > MAX_MEMORY_COPIES_SIZE:
+                return
+
+            self._copies[name] = content
+            self._copies_size += len(content)
+            while self._copies_size > MAX_MEMORY_COPIES_SIZE:
+                _name, evicted = self._copies.popitem(last=False)
+                self._copies_size -= len(evicted)
+
+
+class RedisBackend:
+    """Token buckets, in-flight markers and rendered copies shared by all workers."""
+
+    def __init__(self):
+        from ckan.lib.redis import connect_to_redis
+
+        self.redis = connect_to_redis()
+        self._take = self.redis.register_script(TAKE_SCRIPT)
+
+    def take(self, key: str, rate: float, burst: int) -> float:
+        return float(self._take(
+            keys=[BUCKET_KEY.format(key)], args=[rate, burst, time.time()]
+        ))
+
+    def acquire(self, name: str) -> bool:
+        return bool(self.redis.set(
+            RENDERING_KEY.format(name), 1, nx=True, ex=RENDERING_TTL
+        ))
+
+    def release(self, name: str):
+        self.redis.delete(RENDERING_KEY.format(name))
+
+    def get_copy(self, name: str) -> bytes | None:
+        return self.redis.get(RENDERED_KEY.format(name))
+
+    def set_copy(self, name: str, content: bytes):
+        self.redis.set(RENDERED_KEY.format(name), content, ex=RENDERED_TTL)
+
+
+class RenderingStream:
+    """Chunks of a sitemap file streamed while it is rendered.
+
+    The complete file becomes the last rendered copy when the stream ends. The
+    in-flight marker is released by `close`, which the WSGI server calls even
+    if the stream was never consumed, eg. for `304` responses.
+
+    Args:
+        backend (MemoryBackend | RedisBackend): backend holding the marker.
+        name (str): name of the sitemap file.
+        chunks (Iterable[bytes]): content of the file.
+    """
+
+    def __init__(
+        self, backend: MemoryBackend | RedisBackend, name: str, chunks: Iterable[bytes]
+    ):
+        self._backend = backend
+        self._name = name
+        self._chunks = chunks
+        self._closed = False
+
+    def __iter__(self) -> Iterator[bytes]:
+        content = []
+        for chunk in self._chunks:
+            content.append(chunk)
+            yield chunk
+        self._backend.set_copy(self._name, b"".join(content))
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._backend.release(self._name)
+
+
+_backend: MemoryBackend | RedisBackend | None = None
+
+
+def get_backend() -> MemoryBackend | RedisBackend:
+    """Get the backend selected by `ckanext.sitemap.rate_limit_backend`."""
+    global _backend
+    if _backend is None:
+        if configs.sitemap_rate_limit_backend() == "redis":
+            _backend = RedisBackend()
+        else:
+            _backend = MemoryBackend()
+    return _backend
+
+
+def check_rate_limit(client: str) -> tuple[int, float] | None:
+    """Take tokens for a request from the client and global buckets.
+
+    Args:
+        client (str): address of the client.
+
+    Returns:
+        tuple[int, float] | None: HTTP status and the number of seconds the
+            client should wait, or None if the request is allowed.
+    """
+    backend = get_backend()
+
+    client_rate = configs.sitemap_client_rate_limit()
+    if client_rate:
+        wait = backend.take(
+            f"client:{client}", client_rate / 60, configs.sitemap_client_burst()
+        )
+        if wait:
+            return 429, wait
+
+    global_rate = configs.sitemap_global_rate_limit()
+    if global_rate:
+        wait = backend.take("global", global_rate / 60, configs.sitemap_global_burst())
+        if wait:
+            return 503, wait
+
+    return None
+
+
+def render_once(name: str, render: Callable[[], bytes]) -> bytes | None:
+    """Render the sitemap file unless it is already being rendered.
+
+    Args:
+        name (str): name of the sitemap file.
+        render (Callable[[], bytes]): renders the complete XML document.
+
+    Returns:
+        bytes | None: the fresh document, or the last rendered copy if the file
+            is being rendered by another request. None if the file is being
+            rendered and there is no previous copy.
+    """
+    backend = get_backend()
+    if not backend.acquire(name):
+        return backend.get_copy(name)
+
+    try:
+        content = render()
+        # The copy is stored before the marker is released, so the next
+        # concurrent request of any worker finds it
+        backend.set_copy(name, content)
+    finally:
+        backend.release(name)
+
+    return content
+
+
+def stream_once(
+    name: str, stream: Callable[[], Iterable[bytes]]
+) -> RenderingStream | bytes | None:
+    """Stream the sitemap file unless it is already being rendered.
+
+    Args:
+        name (str): name of the sitemap file.
+        stream (Callable[[], Iterable[bytes]]): produces chunks of the file.
+
+    Returns:
+        RenderingStream | bytes | None: the stream of the fresh file, which
+            must be closed, or the last rendered copy if the file is being
+            rendered by another request. None if the file is being rendered
+            and there is no previous copy.
+    """
+    backend = get_backend()
+    if not backend.acquire(name):
+        return backend.get_copy(name)
+
+    try:
+        return RenderingStream(backend, name, stream())
+    except BaseException:
+        backend.release(name)
+        raise
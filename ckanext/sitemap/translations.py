@@ -0,0 +1,77 @@
+"""Detection of languages that entities are actually translated to.
+
+Multilingual schemas (eg. ckanext-fluent) keep translated values of a field
+in a `<field>_translated` extra as a JSON object keyed by language code.
+An entity is considered translated to a language if any of these objects
+has a non-empty value for it.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+
+from typing import Any
+
+
+log = logging.getLogger(__name__)
+
+TRANSLATED_SUFFIX = r"%\_translated"
+
+
+def get_dataset_translations(names: list[str]) -> dict[str, set[str]]:
+    """Get languages of translated fields for a batch of datasets.
+
+    Args:
+        names (list[str]): names of datasets.
+
+    Returns:
+        dict[str, set[str]]: mapping of dataset name to languages with
+            translated content. Datasets without translations are omitted.
+    """
+    from ckan import model
+
+    query = (
+        model.Session.query(model.Package.name, model.PackageExtra.value)
+        .join(model.PackageExtra, model.PackageExtra.package_id == model.Package.id)
+        .filter(model.Package.name.in_(names))
+        .filter(model.PackageExtra.key.like(TRANSLATED_SUFFIX, escape="\\"))
+    )
+    return _collect_languages(query)
+
+
+def get_group_translations(names: list[str]) -> dict[str, set[str]]:
+    """Get languages of translated fields for a batch of groups or organizations.
+
+    Args:
+        names (list[str]): names of groups.
+
+    Returns:
+        dict[str, set[str]]: mapping of group name to languages with
+            translated content. Groups without translations are omitted.
+    """
+    from ckan import model
+
+    query = (
+        model.Session.query(model.Group.name, model.GroupExtra.value)
+        .join(model.GroupExtra, model.GroupExtra.group_id == model.Group.id)
+        .filter(model.Group.name.in_(names))
+        .filter(model.GroupExtra.key.like(TRANSLATED_SUFFIX, escape="\\"))
+    )
+    return _collect_languages(query)
+
+
+def _collect_languages(rows: Any) -> dict[str, set[str]]:
+    result: dict[str, set[str]] = {}
+    for name, value in rows:
+        try:
+            translations = json.loads(value)
+        except ValueError:
+            log.debug("Translated field of %s is not a valid JSON", name)
+            continue
+        if not isinstance(translations, dict):
+            continue
+        languages = {lang for lang, text in translations.items() if text}
+        if languages:
+            result.setdefault(name, set()).update(languages)
+    return result
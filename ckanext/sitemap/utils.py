@@ -1,19 +1,25 @@
 from __future__ import annotations
 
 import json
+import math
 
-from typing import Any
+from itertools import islice
+from typing import Any, Iterable, Iterator, TypeVar
 from werkzeug.routing import BuildError
 
-from ckan import model
-from ckan.model.system_info import SystemInfo
 from ckan.plugins import toolkit as tk
 
 from ckanext.sitemap import configs
 
 
+T = TypeVar("T")
+
+
 def get_sitemap_settings() -> dict[str, Any]:
     """Get dictionary of all sitemap settings from SystemInfo table."""
+    from ckan import model
+    from ckan.model.system_info import SystemInfo
+
     sysinfo_data = (
         model.Session.query(SystemInfo)
         .filter(SystemInfo.key == ("sitemap")).first()
@@ -40,6 +46,81 @@ def get_sitemap_config(key: str, default: Any = None) -> Any:
     return value
 
 
+def get_section_limit(section: str) -> int:
+    """Get the maximum number of entities included into a sitemap section.
+
+    Args:
+        section (str): name of the sitemap section.
+
+    Returns:
+        int: value of `<section>_limit` setting or the default limit.
+    """
+    return int(get_sitemap_config(
+        f"{section}_limit",
+        configs.sitemap_default_limit()
+    ))
+
+
+def get_included_sections() -> list[str]:
+    """Get the list of sections to include in the sitemap.
+
+    Filters the available sections based on configuration settings, excluding any
+    sections marked with '<section_name>_exclude' in the sitemap settings.
+
+    Returns:
+        list[str]: A list of section names to include in the sitemap.
+    """
+    from ckanext.sitemap.sections import get_sections
+
+    settings = get_sitemap_settings()
+    return [
+        section for section in get_sections()
+        if not tk.asbool(settings.get(f"{section}_exclude"))
+    ]
+
+
+def get_shard_count(section: str, total: int) -> int:
+    """Get the number of sitemap files (shards) required for a section.
+
+    Args:
+        section (str): name of the sitemap section.
+        total (int): total number of entities in the section.
+
+    Returns:
+        int: number of shards holding entities included under the section limit.
+    """
+    included = min(total, get_section_limit(section))
+    return math.ceil(included / configs.sitemap_shard_size())
+
+
+def get_shard_names(section: str, shards: int) -> list[str]:
+    """Get names of sitemap files (shards) of a section.
+
+    Args:
+        section (str): name of the sitemap section.
+        shards (int): number of shards of the section.
+
+    Returns:
+        list[str]: shard names in the `<section>-<page>` format, starting from 1.
+    """
+    return [f"{section}-{page}" for page in range(1, shards + 1)]
+
+
+def iter_batches(items: Iterable[T], size: int) -> Iterator[list[T]]:
+    """Split an iterable into lists of at most `size` items.
+
+    Args:
+        items (Iterable[T]): items to split.
+        size (int): maximum size of a batch.
+
+    Yields:
+        list[T]: consecutive batches of items.
+    """
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
 def get_endpoints_without_arguments() -> list[str]:
     """Filters indexable endpoints to return only those that don't require URL arguments.
     
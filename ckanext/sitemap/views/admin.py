@@ -1,19 +1,21 @@
 from __future__ import annotations
 
 import json
-import requests
+import logging
+from typing import Any
 from urllib.parse import urljoin
 
-from flask import Blueprint, render_template
+from flask import Blueprint, jsonify, render_template, send_from_directory
 from flask.views import MethodView
 
-from ckan.model.system_info import set_system_info, delete_system_info
 from ckan.plugins import toolkit as tk
 
-from ckanext.sitemap import configs, utils
+from ckanext.sitemap import configs, prewarm, profiling, utils
 from ckanext.sitemap.schemas.schema import sitemap_schema
 
 
+log = logging.getLogger(__name__)
+
 sitemap_admin = Blueprint("sitemap_admin", __name__)
 
 class SitemapAdminView(MethodView):
@@ -50,7 +52,17 @@ class SitemapAdminView(MethodView):
         if not robots_txt:
             data["robots_txt"] = utils.get_default_robots_txt()
 
-        return render_template("admin/sitemap_settings.html", data=data)
+        stats = self._get_stats()
+
+        try:
+            tk.check_access("sitemap_profile", {})
+            profiles = profiling.get_profiles()
+        except tk.NotAuthorized:
+            profiles = None
+
+        return render_template(
+            "admin/sitemap_settings.html", data=data, stats=stats, profiles=profiles
+        )
 
 
     def post(self):
@@ -74,9 +86,12 @@ class SitemapAdminView(MethodView):
             if errors:
                 raise tk.ValidationError(errors)
 
+            from ckan.model.system_info import set_system_info
+
             set_system_info("sitemap", json.dumps(validated_data))
 
             tk.h.flash_success(tk._("Settings saved successfully"))
+            self._prewarm()
         except tk.ValidationError as err:
             for field, msg in err.error_summary.items():
                 tk.h.flash_error(f"{field}: {msg}")
@@ -97,15 +112,76 @@ class SitemapAdminView(MethodView):
         """
         if tk.current_user.is_anonymous:
             return tk.abort(403, tk._("Need to be system administrator to administer"))
+        from ckan.model.system_info import delete_system_info
+
         try:
             delete_system_info("sitemap")
             tk.h.flash_success(tk._("All sitemap settings have been reset to defaults"))
+            self._prewarm()
         except Exception as e:
             tk.h.flash_error(tk._("Error resetting settings: %s") % str(e))
         
         return tk.redirect_to("sitemap_admin.settings")
 
 
+    def stats(self):
+        """Return sitemap statistics as JSON for monitoring tools.
+
+        Returns:
+            flask.Response: JSON representation of the `sitemap_stats` action result.
+
+        Raises:
+            403 Forbidden: If the requesting user is not a CKAN sysadmin.
+        """
+        try:
+            stats = tk.get_action("sitemap_stats")({}, {})
+        except tk.NotAuthorized:
+            return tk.abort(403, tk._("Need to be system administrator to administer"))
+
+        return jsonify(stats)
+
+
+    def profile(self):
+        """Profile rendering of the first shard of every included section.
+
+        Returns:
+            werkzeug.wrappers.Response:
+                Redirect response to the sitemap settings view ('sitemap_admin.settings').
+        """
+        try:
+            result = tk.get_action("sitemap_profile")({}, {})
+            tk.h.flash_success(
+                tk._("Profiled sitemap files: %s") % ", ".join(result["profiles"])
+            )
+        except tk.NotAuthorized:
+            return tk.abort(403, tk._("Need to be system administrator to administer"))
+        except tk.ValidationError as err:
+            for field, msg in err.error_summary.items():
+                tk.h.flash_error(f"{field}: {msg}")
+
+        return tk.redirect_to("sitemap_admin.settings")
+
+
+    def download_profile(self, name: str):
+        """Download the stored `.prof` file of a profiled sitemap file.
+
+        Args:
+            name (str): name of the sitemap file, eg. `datasets-1`.
+
+        Returns:
+            flask.Response: the profile as an attachment.
+        """
+        try:
+            tk.check_access("sitemap_profile", {})
+        except tk.NotAuthorized:
+            return tk.abort(403, tk._("Need to be system administrator to administer"))
+
+        path = profiling.get_profiles_path()
+        if not path:
+            return tk.abort(404, tk._("Profile not found"))
+        return send_from_directory(path, f"{name}.prof", as_attachment=True)
+
+
     def ping_search_engines(self):
         """Ping configured search engines with the sitemap URL to prompt indexing.
         
@@ -123,6 +199,8 @@ class SitemapAdminView(MethodView):
             werkzeug.wrappers.Response: 
                 Redirect response to the sitemap settings view ('sitemap_admin.settings').
         """
+        import requests
+
         engines = configs.SEARCH_ENGINES
         site_url = tk.config.get("ckan.site_url", "http://localhost:5000")
         sitemap_url = tk.url_for("sitemap.index")
@@ -138,6 +216,41 @@ class SitemapAdminView(MethodView):
         return tk.redirect_to("sitemap_admin.settings")
 
 
+    def _get_stats(self) -> dict[str, Any] | None:
+        """Get the status panel data, or None if it can't be shown.
+
+        Statistics come from Solr, the database and Redis. An outage of any of
+        them hides the panel instead of breaking the settings page.
+        """
+        from redis.exceptions import RedisError
+        from sqlalchemy.exc import SQLAlchemyError
+
+        from ckan import model
+        from ckan.lib.search.common import SearchError
+
+        try:
+            return tk.get_action("sitemap_stats")({}, {})
+        except tk.NotAuthorized:
+            return None
+        except (SearchError, SQLAlchemyError, RedisError):
+            log.exception("Cannot get sitemap statistics")
+            # A failed query aborts the transaction used to render the page
+            model.Session.rollback()
+            return None
+
+
+    def _prewarm(self):
+        """Regenerate sitemap files in the background after a settings change.
+
+        Every shard is checked, as settings can change URLs of any section.
+        """
+        try:
+            if prewarm.enqueue_prewarm(full=True):
+                tk.h.flash_notice(tk._("Sitemap files will be regenerated in the background"))
+        except Exception as e:
+            tk.h.flash_error(tk._("Error scheduling sitemap generation: %s") % str(e))
+
+
 sitemap_admin.add_url_rule(
     "/ckan-admin/sitemap",
     endpoint="settings",
@@ -152,6 +265,27 @@ sitemap_admin.add_url_rule(
     methods=["GET", "POST"]
 )
 
+sitemap_admin.add_url_rule(
+    "/ckan-admin/sitemap/stats",
+    endpoint="stats",
+    view_func=SitemapAdminView().stats,
+    methods=["GET"]
+)
+
+sitemap_admin.add_url_rule(
+    "/ckan-admin/sitemap/profile",
+    endpoint="profile",
+    view_func=SitemapAdminView().profile,
+    methods=["POST"]
+)
+
+sitemap_admin.add_url_rule(
+    "/ckan-admin/sitemap/profile/<name>.prof",
+    endpoint="download_profile",
+    view_func=SitemapAdminView().download_profile,
+    methods=["GET"]
+)
+
 sitemap_admin.add_url_rule(
     "/ckan-admin/sitemap/ping",
     endpoint="ping_search_engines",
@@ -1,29 +1,132 @@
 from __future__ import annotations
 
-from copy import copy
+import hashlib
+import math
+import os
+import time
+
 from datetime import datetime
-from lxml import etree
-from typing import Any
-from urllib.parse import urljoin
+from typing import Callable, Iterable, Iterator
+from urllib.parse import quote, urljoin
 
-from flask import Blueprint, make_response
+from flask import Blueprint, Response, g, make_response, stream_with_context
 from flask.views import MethodView
 
 from ckan.plugins import toolkit as tk
 
-from ckanext.sitemap import configs, utils
+from ckanext.sitemap import (
+    analytics,
+    configs,
+    exports,
+    prewarm,
+    recent,
+    stats,
+    throttling,
+    utils,
+)
+from ckanext.sitemap.entries import SitemapEntry
+from ckanext.sitemap.generator import INDEX, SitemapStorage
+from ckanext.sitemap.renderers import XML_HEADER, SitemapUrl, get_renderer
+from ckanext.sitemap.sections import SitemapSection, get_sections
 
 
 NSMAP = {None: configs.SITEMAP_NS, "xhtml": configs.XHTML_NS}
+_URL_PLACEHOLDER = "__sitemap_entity__"
+
+# Seconds caches may keep exports rendered on request
+EXPORT_MAX_AGE = 3600
 
 sitemap = Blueprint("sitemap", __name__)
 
+class SitemapIndexView(MethodView):
+    """A MethodView for the sitemap index.
+
+    The sitemap of every included section is split into shards of at most
+    `ckanext.sitemap.shard_size` URLs. The index lists all of them, so crawlers
+    can fetch sections separately.
+    """
+    def __init__(self):
+        self.site_url = tk.config.get("ckan.site_url", "http://localhost:5000")
+
+
+    def get(self):
+        """Handle GET requests to serve the sitemap index.
+
+        The index written by `ckan sitemap generate` is served when it exists.
+        Otherwise the index is built from the current section sizes.
+
+        Returns:
+            flask.Response: A response with the `sitemapindex` XML document.
+        """
+        storage = SitemapStorage()
+        manifest = storage.get_manifest()
+        if manifest:
+            prewarm.refresh_if_stale(manifest["generated_at"])
+            return _generated_response(
+                storage,
+                INDEX,
+                manifest["index"]["etag"],
+                manifest["index"].get("modified", manifest["generated_at"]),
+            )
+
+        content = throttling.render_once(INDEX, self._render_index)
+        if content is None:
+            return _unavailable_response(503, throttling.RENDERING_RETRY_AFTER)
+        return _xml_response(content)
+
+
+    def _render_index(self) -> bytes:
+        sections = get_sections()
+        shards = []
+        for name in utils.get_included_sections():
+            count = utils.get_shard_count(name, sections[name].count())
+            shards.extend((name, page, None) for page in range(1, count + 1))
+
+        return self._generate_index_content(shards)
+
+
+    def _generate_index_content(self, shards: list[tuple[str, int, str | None]]) -> bytes:
+        """Generate the sitemap index XML structure.
+
+        Args:
+            shards (list[tuple[str, int, str | None]]): section name, shard number
+                and optional ISO-formatted date of the last modification of
+                every listed shard.
+
+        Returns:
+            bytes: The sitemap index XML document, including the XML declaration.
+        """
+        from lxml import etree
+
+        date_format = configs.sitemap_date_format()
+        root = etree.Element("sitemapindex", attrib={}, nsmap=NSMAP)
+
+        # The recent changes sitemap goes first, it is the most often updated one
+        if _is_recent_enabled():
+            item = etree.SubElement(root, "sitemap", attrib={}, nsmap=NSMAP)
+            loc = etree.SubElement(item, "loc", attrib={}, nsmap=NSMAP)
+            loc.text = self.site_url + tk.url_for("sitemap.recent")
+
+        for section, page, modified in shards:
+            item = etree.SubElement(root, "sitemap", attrib={}, nsmap=NSMAP)
+            loc = etree.SubElement(item, "loc", attrib={}, nsmap=NSMAP)
+            loc.text = self.site_url + tk.url_for(
+                "sitemap.section", section=section, page=page
+            )
+            if modified:
+                lastmod = etree.SubElement(item, "lastmod", attrib={}, nsmap=NSMAP)
+                lastmod.text = SitemapView._format_lastmod(modified, date_format)
+
+        return XML_HEADER + etree.tostring(root)
+
+
 class SitemapView(MethodView):
     """A MethodView for generating XML sitemaps in CKAN.
     
-    This view generates sitemap.xml files following the sitemap protocol specification,
-    including URLs for datasets, organizations, groups, and custom pages. The sitemap
-    supports:
+    This view generates a single shard of a sitemap section following the sitemap
+    protocol specification, including URLs for datasets, organizations, groups,
+    custom pages and sections registered through the `ISitemap` interface. The
+    sitemap supports:
     - Multi-language content through hreflang tags
     - Customizable change frequency and priority
     - Filterable sections and configurable limits
@@ -37,13 +140,18 @@ class SitemapView(MethodView):
     """
     def __init__(self):
         self.site_url = tk.config.get("ckan.site_url", "http://localhost:5000")
+        self._url_templates: dict[str, str] = {}
 
 
-    def get(self):
-        """Handle GET requests to generate and serve the sitemap.xml file.
+    def get(self, section: str, page: int):
+        """Handle GET requests to generate and serve a sitemap shard.
         
-        Generates the complete sitemap XML structure, adds the XML header, and returns
-        a properly formatted HTTP response with XML content type.
+        Generates the sitemap XML structure of the shard, adds the XML header, and
+        returns a properly formatted HTTP response with XML content type.
+
+        Args:
+            section (str): name of the sitemap section.
+            page (int): number of the shard within the section, starting from 1.
 
         Returns:
             flask.Response: A response object containing:
@@ -51,107 +159,199 @@ class SitemapView(MethodView):
                 - HTTP status code 200
                 - Content-Type header set to application/xml
         """
-        # Generate sitemap XML content
-        root = self._generate_sitemap_content()
+        storage = SitemapStorage()
+        manifest = storage.get_manifest()
+        if manifest:
+            prewarm.refresh_if_stale(manifest["generated_at"])
+            shard = manifest["shards"].get(f"{section}-{page}")
+            if not shard:
+                return tk.abort(404, tk._("Sitemap not found"))
+            return _generated_response(
+                storage,
+                f"{section}-{page}",
+                shard["etag"],
+                shard.get("modified", shard["watermark"]),
+            )
 
-        # Add XML header
-        content = etree.tostring(root)
-        content = '<?xml version="1.0" encoding="UTF-8"?>\n' + content.decode("utf-8")
-        return make_response(
-            (content, 200, {"Content-Type": "application/xml; charset=utf-8"})
+        if section not in utils.get_included_sections():
+            return tk.abort(404, tk._("Sitemap not found"))
+
+        # Generate sitemap XML content
+        content = throttling.render_once(
+            f"{section}-{page}", lambda: self._render_shard(section, page)
         )
+        if content is None:
+            return _unavailable_response(503, throttling.RENDERING_RETRY_AFTER)
+        return _xml_response(content)
 
 
-    def _generate_sitemap_content(self):
-        """Generate the complete sitemap XML structure.
+    def _render_shard(self, section: str, page: int) -> bytes:
+        sitemap_section = get_sections()[section]
+        total = sitemap_section.count()
+        if not 1 <= page <= utils.get_shard_count(section, total):
+            return tk.abort(404, tk._("Sitemap not found"))
+
+        return self._generate_sitemap_content(sitemap_section, page, total)
+
+
+    def _generate_sitemap_content(
+        self, section: SitemapSection, page: int, total: int
+    ) -> bytes:
+        """Generate the sitemap XML document of a single shard.
         
-        Creates the root urlset element and populates it with URLs for all included
-        sections (datasets, organizations, groups, pages). Configures each URL entry
-        with:
+        Creates the root urlset element and populates it with URLs of the section
+        entities that belong to the shard. Configures each URL entry with:
         - Location (loc)
         - Last modification date (lastmod)
         - Change frequency (changefreq)
         - Priority (priority)
         - Optional hreflang alternate links
 
+        The document is serialized by the engine selected with the
+        `ckanext.sitemap.renderer` option.
+
+        Args:
+            section (SitemapSection): the sitemap section.
+            page (int): number of the shard within the section, starting from 1.
+            total (int): total number of entities in the section.
+
         Returns:
-            lxml.etree.Element: The root XML element of the generated sitemap.
+            bytes: The generated XML document, including the XML declaration.
         """
-        date_format = configs.sitemap_date_format()
-        include_hreflang = configs.sitemap_include_hreflang()
-        default_changefreq = configs.sitemap_default_changefreq()
-        default_priority = configs.sitemap_default_priority()
-        available_languages = tk.config.get("ckan.locales_offered", ["en"])
+        entries = self._get_shard_entries(section, page, total)
+        return self._render_urlset(
+            section, self._iter_urls(section, entries), f"{section.name}-{page}"
+        )
 
-        root = etree.Element("urlset", attrib={}, nsmap=NSMAP)
-        
-        for section in self._get_included_sections():
-            entities = etree.SubElement(root, section, attrib={}, nsmap=NSMAP)
-            
-            comment = etree.Comment(f"========== {section.capitalize()} ==========")
-            entities.insert(1, comment)
-            for entity in self._get_entities(section):
-                url = etree.SubElement(entities, "url", attrib={}, nsmap=NSMAP)
-                
-                loc = etree.SubElement(url, "loc", attrib={}, nsmap=NSMAP)
-                loc.text = self._get_entity_url(entity)
-                
-                # Include hreflang attribute if enabled in config
-                if tk.asbool(include_hreflang):
-                    attrib = {
-                        "rel": "alternate",
-                        "hreflang": "x-default",
-                        "href": self._get_entity_url(entity)
-                    }
-                    etree.SubElement(url, "{https://www.w3.org/1999/xhtml}link", attrib=attrib, nsmap=NSMAP)
-
-                    for lang in available_languages:
-                        attrib = {
-                            "rel": "alternate",
-                            "hreflang": lang,
-                            "href": self._get_entity_url(entity, lang)
-                        }
-                        etree.SubElement(url, "{https://www.w3.org/1999/xhtml}link", attrib=attrib, nsmap=NSMAP)
-                
-                lastmod = etree.SubElement(url, "lastmod", attrib={}, nsmap=NSMAP)
-                if section in ["datasets", "resources"]:
-                    date_str = entity["metadata_modified"]
-                else:
-                    date_str = datetime.now().strftime("%Y-%m-%d")
-                lastmod.text = self._format_lastmod(date_str, date_format)
-                
-                changefreq = etree.SubElement(url, "changefreq", attrib={}, nsmap=NSMAP)
-                changefreq.text = utils.get_sitemap_config(
-                    f"{section}_changefreq",
-                    str(default_changefreq)
-                )
-                
-                priority = etree.SubElement(url, "priority", attrib={}, nsmap=NSMAP)
-                priority.text = utils.get_sitemap_config(
-                    f"{section}_priority",
-                    str(default_priority)
-                )
 
-        return root
+    def _get_shard_entries(
+        self, section: SitemapSection, page: int, total: int
+    ) -> Iterator[SitemapEntry]:
+        """Produce entries of a shard of the sitemap rendered on request.
+
+        Args:
+            section (SitemapSection): the sitemap section.
+            page (int): number of the shard within the section, starting from 1.
+            total (int): total number of entities in the section.
 
+        Yields:
+            SitemapEntry: entries of the shard.
+        """
+        shard_size = configs.sitemap_shard_size()
+        included = min(total, utils.get_section_limit(section.name))
+        offset = (page - 1) * shard_size
+        limit = min(shard_size, included - offset)
 
-    def _get_included_sections(self) -> list[str]:
-        """Get the list of sections to include in the sitemap.
-        
-        Filters the available sections based on configuration settings, excluding any
-        sections marked with '<section_name>_exclude' in the sitemap settings.
+        return section.iter_entries(offset, limit)
+
+
+    def _render_urlset(
+        self, section: SitemapSection, urls: Iterable[SitemapUrl], name: str
+    ) -> bytes:
+        """Render the sitemap XML document from URLs of a section.
+
+        Args:
+            section (SitemapSection): the sitemap section.
+            urls (Iterable[SitemapUrl]): values of `<url>` elements, usually
+                produced by `_iter_urls`.
+            name (str): name of the sitemap file, used in generation statistics.
 
         Returns:
-            list[str]: A list of section names to include in the sitemap.
+            bytes: The generated XML document, including the XML declaration.
+        """
+        started_at = datetime.now()
+        timer = time.perf_counter()
+        count = 0
+
+        def counted():
+            nonlocal count
+            for url in urls:
+                count += 1
+                yield url
+
+        content = get_renderer().render_urlset(
+            counted(), comment=self._get_comment(section)
+        )
+
+        stats.record_generation(name, started_at, time.perf_counter() - timer, count)
+
+        return content
+
+
+    @staticmethod
+    def _get_comment(section: SitemapSection) -> str:
+        """Get the comment placed before the first URL of the section sitemap."""
+        return f"========== {section.name.capitalize()} =========="
+
+
+    def _iter_urls(
+        self, section: SitemapSection, entries: Iterable[SitemapEntry]
+    ) -> Iterator[SitemapUrl]:
+        """Prepare values of `<url>` elements for entities of a section.
+
+        Args:
+            section (SitemapSection): the sitemap section.
+            entries (Iterable[SitemapEntry]): entities of the section.
+
+        Yields:
+            SitemapUrl: values of a single `<url>` element.
         """
-        available_sections = copy(configs.SITEMAP_SECTIONS)
-        for key in utils.get_sitemap_settings():
-            if key.endswith("exclude"):
-                available_sections.remove(key.split("_")[0])
-        return available_sections
+        date_format = configs.sitemap_date_format()
+        include_hreflang = tk.asbool(configs.sitemap_include_hreflang())
+        default_changefreq = configs.sitemap_default_changefreq()
+        default_priority = configs.sitemap_default_priority()
+        available_languages = tk.aslist(tk.config.get("ckan.locales_offered", ["en"]))
+        default_language = tk.config.get("ckan.locale_default", "en")
+        detect_translations = include_hreflang and configs.sitemap_detect_translations()
+
+        # Section settings are the same for every URL, read them once
+        changefreq = utils.get_sitemap_config(
+            f"{section.name}_changefreq",
+            str(default_changefreq)
+        )
+        priority = utils.get_sitemap_config(
+            f"{section.name}_priority",
+            str(default_priority)
+        )
+
+        batches = utils.iter_batches(entries, configs.SITEMAP_TRANSLATIONS_BATCH_SIZE)
+        for batch in batches:
+            # One lookup per batch instead of one per entity
+            translations = section.get_translations(batch) if detect_translations else None
+            priorities = section.get_priorities(batch) or {}
+
+            for entity in batch:
+                loc = self._get_entity_url(entity)
+                alternates = ()
+                
+                # Include hreflang attribute if enabled in config
+                if include_hreflang:
+                    languages = available_languages
+                    if translations is not None:
+                        translated = translations.get(entity.name, set())
+                        languages = [
+                            lang for lang in available_languages
+                            if lang == default_language or lang in translated
+                        ]
+                    alternates = (("x-default", loc),) + tuple(
+                        (lang, self._get_entity_url(entity, lang)) for lang in languages
+                    )
+
+                # Entities without a modification date, eg. pages and groups,
+                # have no <lastmod>, so their shards stay the same from day
+                # to day
+                yield SitemapUrl(
+                    loc,
+                    self._format_lastmod(entity.lastmod, date_format)
+                    if entity.lastmod else None,
+                    changefreq,
+                    priorities.get(entity.name, priority),
+                    alternates,
+                )
 
 
-    def _format_lastmod(self, date_str: str, format: str) -> str:
+    @staticmethod
+    def _format_lastmod(date_str: str, format: str) -> str:
         """Format a date string according to the specified format.
         
         Args:
@@ -168,89 +368,308 @@ class SitemapView(MethodView):
             return date_str.split("T")[0]
 
 
-    def _get_entities(self, section: str) -> list[dict[str, Any]]:
-        """Retrieve entities for a specific sitemap section.
+    def _get_entity_url(self, entity: SitemapEntry, lang: str = None) -> str:
+        """Generate the full URL for a sitemap entity.
+        
+        Args:
+            entity (SitemapEntry): The entity record
+            lang (str, optional): Language code for localized URLs
+
+        Returns:
+            str: The complete absolute URL for the entity
+        """
+        if lang:
+            base_url = urljoin(self.site_url, lang)
+        else:
+            base_url = self.site_url
         
+        if entity.type == "page":
+            return base_url + tk.h.url_for(entity.name)
+        
+        if entity.original_path:
+            return urljoin(base_url, entity.original_path)
+
+        # Routing is resolved once per entity type, the name is substituted
+        # into the cached path
+        template = self._url_templates.get(entity.type)
+        if template is None:
+            template = self._url_templates[entity.type] = tk.url_for(
+                entity.type + ".read", id=_URL_PLACEHOLDER
+            )
+        return base_url + template.replace(_URL_PLACEHOLDER, quote(entity.name))
+
+
+class SitemapExportView(MethodView):
+    """A MethodView for plain formats of sitemap shards.
+
+    Shards are available as a text file with one URL per line and as JSON
+    Lines, see `ckanext.sitemap.exports`. Exports written by the generator are
+    served like XML files; otherwise the export is streamed while the shard
+    entities are read. Like XML shards, a single request renders the export,
+    and concurrent ones get the last rendered copy.
+    """
+    def get(self, section: str, page: int, format: str):
+        """Handle GET requests to serve a shard in a plain format.
+
         Args:
-            section (str): The section name (datasets, organizations, groups, or pages)
+            section (str): name of the sitemap section.
+            page (int): number of the shard within the section, starting from 1.
+            format (str): name of the format, `txt` or `jsonl`.
 
         Returns:
-            list[dict[str, Any]]: A list of entity dictionaries containing:
-                - For datasets: package_search results
-                - For organizations: organization_list results
-                - For groups: group_list results
-                - For pages: configured endpoints from sitemap_included_endpoints
+            flask.Response: A response with the export of the shard.
         """
-        result = []
-        limit = int(utils.get_sitemap_config(
-            f"{section}_limit",
-            configs.sitemap_default_limit()
-        ))
-        start = 0
-
-        if section == "pages":
-            result = utils.get_endpoints_without_arguments()
-            if limit < len(result):
-                result =result[:limit]
-
-        elif section == "datasets":
-            result = tk.get_action("package_search")(
-                {},
-                {
-                    "q": "state:active",
-                    "rows": limit,
-                    "start": start,
-                    "include_private": False,
-                    "include_drafts": False,
-                },
-            )["results"]
-        elif section == "organizations":
-            result = tk.get_action("organization_list")(
-                {},
-                {
-                    "limit": limit,
-                    "offset": start,
-                    "all_fields": True,
-                },
+        content_type, serialize = exports.EXPORT_FORMATS[format]
+        storage = SitemapStorage()
+        manifest = storage.get_manifest()
+        if manifest:
+            prewarm.refresh_if_stale(manifest["generated_at"])
+            # Generated shards differ from the ones rendered on request, so
+            # only exports written by the generator are served
+            shard = manifest["shards"].get(f"{section}-{page}")
+            export = shard and shard.get("exports", {}).get(format)
+            if not export:
+                return tk.abort(404, tk._("Sitemap not found"))
+            return _generated_response(
+                storage,
+                f"{section}-{page}",
+                export["etag"],
+                shard.get("modified", shard["watermark"]),
+                ext=format,
+                mimetype=content_type,
             )
-        elif section == "groups":
-            result = tk.get_action("group_list")(
-                {},
-                {
-                    "limit": limit,
-                    "offset": start,
-                    "all_fields": True,
-                },
+
+        if section not in utils.get_included_sections():
+            return tk.abort(404, tk._("Sitemap not found"))
+
+        modified: list[str] = []
+        content = throttling.stream_once(
+            f"{section}-{page}.{format}",
+            lambda: self._stream_export(section, page, serialize, modified),
+        )
+        if content is None:
+            return _unavailable_response(503, throttling.RENDERING_RETRY_AFTER)
+
+        if isinstance(content, bytes):
+            response = make_response((content, 200, {"Content-Type": content_type}))
+            response.set_etag(hashlib.sha1(content).hexdigest())
+        else:
+            response = Response(
+                stream_with_context(iter(content)), content_type=content_type
             )
+            response.call_on_close(content.close)
+            if modified:
+                response.last_modified = datetime.fromisoformat(modified[0])
 
-        return result
+        response.cache_control.public = True
+        response.cache_control.max_age = EXPORT_MAX_AGE
+        return response.make_conditional(tk.request)
 
 
-    def _get_entity_url(
-        self, entity: dict[str, Any] | str, lang: str = None) -> str:
-        """Generate the full URL for a sitemap entity.
-        
+    def _stream_export(
+        self,
+        section: str,
+        page: int,
+        serialize: Callable[[Iterable[SitemapUrl], str], Iterator[bytes]],
+        modified: list[str],
+    ) -> Iterator[bytes]:
+        """Read entries of the shard and produce a stream of its export.
+
         Args:
-            entity (dict[str, Any] | str): The entity data or endpoint name
-            lang (str, optional): Language code for localized URLs
+            section (str): name of the sitemap section.
+            page (int): number of the shard within the section, starting from 1.
+            serialize (Callable): serializer of the export format.
+            modified (list[str]): receives the latest modification time of the
+                shard entries, if any of them has one.
 
         Returns:
-            str: The complete absolute URL for the entity
+            Iterator[bytes]: chunks of the export.
         """
-        if lang:
-            base_url = urljoin(self.site_url, lang)
+        sitemap_section = get_sections()[section]
+        total = sitemap_section.count()
+        if not 1 <= page <= utils.get_shard_count(section, total):
+            return tk.abort(404, tk._("Sitemap not found"))
+
+        view = SitemapView()
+        entries = list(view._get_shard_entries(sitemap_section, page, total))
+        lastmods = [entry.lastmod for entry in entries if entry.lastmod]
+        if lastmods:
+            modified.append(max(lastmods))
+        return serialize(view._iter_urls(sitemap_section, entries), section)
+
+
+class SitemapRecentView(MethodView):
+    """A MethodView for the sitemap of recently changed datasets.
+
+    The sitemap is served from memory: it lists datasets from the ring buffer
+    of the current worker and is re-rendered only when the buffer changes.
+    """
+    def get(self):
+        """Handle GET requests to serve the recent changes sitemap.
+
+        Returns:
+            flask.Response: A conditional response with the `urlset` XML document.
+        """
+        if not _is_recent_enabled():
+            return tk.abort(404, tk._("Sitemap not found"))
+
+        content, etag = recent.get_recent_changes().get_rendered(self._render)
+        response = make_response(
+            (content, 200, {"Content-Type": "application/xml; charset=utf-8"})
+        )
+        response.set_etag(etag)
+        return response.make_conditional(tk.request)
+
+
+    def _render(self, entries: list[SitemapEntry]) -> bytes:
+        section = recent.RecentSection(entries)
+        return SitemapView()._generate_sitemap_content(section, 1, len(entries))
+
+
+def _is_recent_enabled() -> bool:
+    """Check if the recent changes sitemap is enabled and datasets are included."""
+    return bool(configs.sitemap_recent_hours()) and (
+        "datasets" in utils.get_included_sections()
+    )
+
+
+def _xml_response(content: bytes):
+    """Build an XML response from a serialized XML document."""
+    return make_response(
+        (content, 200, {"Content-Type": "application/xml; charset=utf-8"})
+    )
+
+
+def _unavailable_response(status: int, retry_after: float):
+    """Build a response asking the client to repeat the request later."""
+    message = (
+        tk._("Too many sitemap requests") if status == 429
+        else tk._("Sitemap is temporarily unavailable")
+    )
+    return make_response(
+        (message, status, {"Retry-After": str(math.ceil(retry_after))})
+    )
+
+
+def _generated_response(
+    storage: SitemapStorage,
+    name: str,
+    etag: str,
+    modified: str,
+    ext: str = "xml",
+    mimetype: str = "application/xml; charset=utf-8",
+):
+    """Build a response from a file written by the sitemap generator.
+
+    The gzip variant of the file is served to clients that accept it. The
+    response is conditional, so crawlers re-fetching an unchanged file get
+    `304 Not Modified`.
+
+    Depending on `ckanext.sitemap.serve_mode`, the file body is sent by the
+    worker itself, with support of range requests, or handed over to the web
+    server through `X-Sendfile` or `X-Accel-Redirect` header.
+    """
+    from flask import send_file
+
+    mode = configs.sitemap_serve_mode()
+    last_modified = datetime.fromisoformat(modified)
+    compressed = "gzip" in tk.request.accept_encodings
+
+    if mode == "python":
+        response = send_file(
+            storage.file_path(name, compressed, ext),
+            mimetype=mimetype,
+            etag=etag + "-gzip" if compressed else etag,
+            last_modified=last_modified,
+        )
+        # send_file appends a charset to text types once more
+        response.headers["Content-Type"] = mimetype
+    else:
+        # The web server sends the file body and handles range requests,
+        # the worker only answers conditional requests
+        response = make_response((b"", 200, {"Content-Type": mimetype}))
+        if mode == "x-accel-redirect":
+            # nginx picks the gzip variant itself with `gzip_static`
+            compressed = False
+            response.headers["X-Accel-Redirect"] = (
+                configs.sitemap_accel_redirect_location().rstrip("/")
+                + "/" + os.path.basename(storage.file_path(name, ext=ext))
+            )
         else:
-            base_url = self.site_url
-        
-        if isinstance(entity, str):
-            return base_url + tk.h.url_for(entity)
-        
-        if entity.get("original_path"):
-            return urljoin(base_url, entity["original_path"])
-        return base_url + tk.url_for(entity["type"] + ".read", id=entity["name"])
+            path = storage.file_path(name, compressed, ext)
+            response.headers["X-Sendfile"] = path
+            response.content_length = os.path.getsize(path)
+
+        response.set_etag(etag + "-gzip" if compressed else etag)
+        response.last_modified = last_modified
+        response = response.make_conditional(tk.request)
+
+    if compressed:
+        response.headers["Content-Encoding"] = "gzip"
+    response.vary.add("Accept-Encoding")
+    return response
+
+
+@sitemap.before_request
+def _start_timer():
+    g.sitemap_started = time.perf_counter()
+
+
+@sitemap.before_request
+def _check_rate_limit():
+    """Reject the request if the client or all clients are over the rate limit."""
+    limited = throttling.check_rate_limit(tk.request.remote_addr or "")
+    if limited:
+        return _unavailable_response(*limited)
+
+
+@sitemap.after_request
+def _count_crawler_request(response):
+    """Count the request in crawler analytics of the current worker."""
+    started = g.pop("sitemap_started", None)
+    if started is None or not configs.sitemap_crawler_stats():
+        return response
+
+    # Section and page come from the URL, so only shards that the view has
+    # found are counted under their names to keep the number of counters
+    # bounded
+    view_args = tk.request.view_args or {}
+    status = response.status_code
+    if "section" not in view_args:
+        name = tk.request.path.rsplit("/", 1)[-1]
+    elif 200 <= status < 300 or status == 304:
+        name = "{}-{}.{}".format(
+            view_args["section"], view_args["page"], view_args.get("format", "xml")
+        )
+    else:
+        name = analytics.OTHER_SHARDS
+
+    analytics.get_crawler_counters().record(
+        analytics.classify_user_agent(tk.request.user_agent.string or ""),
+        name,
+        response.status_code,
+        response.content_length or 0,
+        time.perf_counter() - started,
+    )
+    return response
 
 
 sitemap.add_url_rule(
     "/sitemap.xml",
-    view_func=SitemapView.as_view("index")
+    view_func=SitemapIndexView.as_view("index")
+)
+
+sitemap.add_url_rule(
+    "/sitemap/recent.xml",
+    view_func=SitemapRecentView.as_view("recent")
+)
+
+sitemap.add_url_rule(
+    "/sitemap/<section>-<int:page>.xml",
+    view_func=SitemapView.as_view("section")
+)
+
+sitemap.add_url_rule(
+    "/sitemap/<section>-<int:page>.<any(txt, jsonl):format>",
+    view_func=SitemapExportView.as_view("export")
 )